@@ -7,12 +7,45 @@
     https://github.com/ZeeQyu/TileGame
 
     Launches the game. For more information, check the file /src/main.py
+    Run with --headless to run the game logic without a window as fast as possible, for example
+        python TileGame.py --headless --ticks 2000 --seed 1
+    Run with --plan to print how many of every factory the factory chains need, and how much they make.
 """
 
 import sys
 import os
+import argparse
+
+parser = argparse.ArgumentParser(description="TileGame, an experimental tile-based game about moving resources.")
+parser.add_argument("--headless", action="store_true",
+                    help="run the game without a window and print how many ticks per second it runs at")
+parser.add_argument("--ticks", type=int, default=1000,
+                    help="the amount of ticks to run in headless mode (default 1000)")
+parser.add_argument("--seed", type=int, default=None,
+                    help="seed for the random map generation")
+parser.add_argument("--plan", action="store_true",
+                    help="print how many of every factory the factory chains need and how much they make, then quit")
+parser.add_argument("--distance", type=float, default=None,
+                    help="the amount of tiles robots walk between factories in the --plan chains")
+args = parser.parse_args()
+
+if args.headless or args.plan:
+    # Has to be set before pygame is imported
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
 
 sys.path.append(os.path.join(os.getcwd(), "src"))
-from src import main
+if args.plan:
+    from src import recipes
+    from src import constants as c
+
+    distance = c.RECIPE_PLAN_DISTANCE if args.distance is None else args.distance
+    for name, plan in sorted(recipes.solve_all(distance).items()):
+        print(plan)
+elif args.headless:
+    from src import simulation
+
+    simulation.run_headless(args.ticks, args.seed)
+else:
+    from src import main
 
-main.main()
+    main.main(args.seed)
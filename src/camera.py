@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/camera.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the Camera class, which decides which part of the map is shown in the window.
+    Everything in the game has coordinates in pixels on the map (world coordinates), and the camera
+    turns those into coordinates in the window (screen coordinates) when things are painted.
+    Things outside of the view aren't painted at all.
+"""
+import pygame
+
+from src import globals as g
+from src import constants as c
+
+
+def window_size():
+    """ Returns the size of the window in pixels for the current map, which is the size of the map
+        but at most c.WINDOW_TILES tiles.
+    """
+    return (min(g.width, c.WINDOW_TILES[0]) * c.TILE_SIZE,
+            min(g.height, c.WINDOW_TILES[1]) * c.TILE_SIZE)
+
+
+class Camera(object):
+    """ A view of the map the size of the window. x and y are the world coordinates of the top left corner
+        of the view, and are kept inside of the map.
+    """
+    def __init__(self, width, height):
+        """ "width" and "height" are the size of the view (the window) in pixels.
+        """
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+
+    def follow(self, entity):
+        """ Moves the camera so that the entity is in the middle of the view, as long as the view
+            stays inside of the map.
+
+            returns True if the camera moved, so that the screen needs to be redrawn
+        """
+        x = int(entity.x + entity.width / 2) - self.width // 2
+        y = int(entity.y + entity.height / 2) - self.height // 2
+        # Don't show anything outside of the map
+        x = max(0, min(x, g.width * c.TILE_SIZE - self.width))
+        y = max(0, min(y, g.height * c.TILE_SIZE - self.height))
+        if (x, y) == (self.x, self.y):
+            return False
+        self.x = x
+        self.y = y
+        return True
+
+    def to_screen(self, x, y):
+        """ Returns the screen coordinates of the world coordinates x, y
+        """
+        return x - self.x, y - self.y
+
+    def is_visible(self, x, y, width, height):
+        """ Returns True if any part of the rectangle at the world coordinates x, y with the size
+            width, height is in the view.
+        """
+        return (x + width > self.x and x < self.x + self.width and
+                y + height > self.y and y < self.y + self.height)
+
+    def rect(self):
+        """ Returns a pygame.Rect of the view in world coordinates, which is the part of the map
+            that should be painted on the screen.
+        """
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def visible_tiles(self):
+        """ Returns the range of tiles that are at least partly in the view as
+            (first x, first y, last x + 1, last y + 1), clamped to the map.
+        """
+        return (max(self.x // c.TILE_SIZE, 0),
+                max(self.y // c.TILE_SIZE, 0),
+                min((self.x + self.width - 1) // c.TILE_SIZE + 1, g.width),
+                min((self.y + self.height - 1) // c.TILE_SIZE + 1, g.height))
@@ -32,7 +32,8 @@ class Img(object):
     """
     def __init__(self, png, color_code=None, random=False, collides=False,
                  placeable=False, destroy=None, evolve=None, multi_tile=None,
-                 factory_input=[], factory_output=[], factory_timer=0, factory_alt_image=None, microtiles=None):
+                 factory_input=[], factory_output=[], factory_timer=0, factory_alt_image=None, microtiles=None,
+                 rotates=False):
         """ Initializes a tile image or other image. Should be stored in a dictionary where the
                 key is the string identifier for the image (example: "sapling")
             "png" should be the filename in the res folder (example: "sapling.png", "sapling4.png")
@@ -72,6 +73,8 @@ class Img(object):
                 the top left corners used to construct this micro tile, in following order: similar tiles to all sides,
                 similar tiles to both sides but not the corner, similar tile on tbe top and similar tile nowhere. For
                 more information, please read doc/microtiles.txt
+            "rotates" should be True if the image is painted rotated, like entities that turn when they move and
+                launchers. The rotated images are made once when the graphics are loaded.
 
             If factory_input and evolve is present in the same tile,
                 said tile will evolve the evolve-time in ticks after the required goods are delivered.
@@ -93,6 +96,7 @@ class Img(object):
         self.factory_timer = factory_timer
         self.factory_alt_image = factory_alt_image
         self.microtiles = microtiles
+        self.rotates = rotates
 
         # The following code makes sure the factory input and output are lists in lists and not just lists.
         for item in factory_input:
@@ -212,7 +216,7 @@ IMAGES = {
     "furnace_on": Img("furnace.png"),
 
     "launcher": Img("launcher.png", collides=True, destroy=[15, "package"],
-                    factory_input=[["iron", 1], ["battery", 1]], factory_output=[["rocket", 1]]),
+                    factory_input=[["iron", 1], ["battery", 1]], factory_output=[["rocket", 1]], rotates=True),
     "package_gen": Img("packageGen.png", placeable=True, destroy=[15, "blink_package"],
                        evolve=[0, 0, "package_gen_iron"], factory_input=[["iron", 1]]),
     "package_gen_iron": Img("packageGenIron.png", evolve=[20, 20, "package_gen_package"], destroy=[15, "package_gen"]),
@@ -238,16 +242,16 @@ IMAGES = {
     "collide_pointer": Img("emptyPixel.png", collides=True),
 
     # entities
-    "player": Img("player.png"),
-    "beetle": Img("beetle.png"),
+    "player": Img("player.png", rotates=True),
+    "beetle": Img("beetle.png", rotates=True),
     "moving_package": Img("packageNograss.png"),
-    "ufo": Img("enemyUfo.png"),
-    "robot_empty": Img("robotEmpty.png"),
-    "robot_ore": Img("robotOre.png"),
-    "robot_iron": Img("robotIron.png"),
-    "robot_waste": Img("robotWaste.png"),
-    "robot_battery": Img("robotBattery.png"),
-    "rocket": Img("rocket.png"),
+    "ufo": Img("enemyUfo.png", rotates=True),
+    "robot_empty": Img("robotEmpty.png", rotates=True),
+    "robot_ore": Img("robotOre.png", rotates=True),
+    "robot_iron": Img("robotIron.png", rotates=True),
+    "robot_waste": Img("robotWaste.png", rotates=True),
+    "robot_battery": Img("robotBattery.png", rotates=True),
+    "rocket": Img("rocket.png", rotates=True),
 
     # interface
     "empty": Img("emptyPixel.png"),
@@ -346,6 +350,16 @@ DEFAULT_PLACE_TILE = "sapling"
 
 # The size of tiles. Probably will never be anything else than 16.
 TILE_SIZE = 16
+# The amount of tile images in every row of the image atlases made by graphics.convert_graphics()
+ATLAS_COLUMNS = 16
+# The largest size of the window, in tiles. Maps larger than this scroll with the player,
+# and smaller maps get a window just the size of the map.
+WINDOW_TILES = (60, 40)
+# The map is painted in chunks of this many tiles in both directions
+CHUNK_SIZE = 32
+# The amount of bytes the painted chunks of the map may take up before the least recently used ones are thrown away.
+# A chunk of 32 by 32 tiles takes up about 1 MB.
+CHUNK_CACHE_MEMORY = 64 * 1024 * 1024
 # Set to true if all textures should be non-random.
 DEACTIVATE_RANDOM_TEXTURES = False
 # Set to true to disable all microtiles and default to one texture
@@ -390,6 +404,34 @@ ROBOT_COME_HOME_TIME = 5
 ROBOT_LOAD_TIME = 10
 ROBOT_RECONSTRUCT_TIME = 600
 
+# Pathfinding
+# The width and height in tiles of the map regions the path cache keeps track of changes in
+PATH_CACHE_REGION_SIZE = 8
+# The maximum amount of paths kept in the path cache. The oldest paths are removed first
+PATH_CACHE_SIZE = 2000
+
+# The amount of tiles robots are expected to walk between factories when recipes.solve() plans factory chains
+RECIPE_PLAN_DISTANCE = 8
+
+# Production metrics
+# The amount of ticks counted together in metrics.Stats. Windows are rounded to this many ticks
+METRICS_BUCKET_TICKS = 20
+# The amount of ticks the metrics are counted over by default, and shown over in the metrics overlay
+METRICS_WINDOW_TICKS = 1200
+# The font size and colors of the metrics overlay that is shown when aiming at a factory
+METRICS_FONT_SIZE = 14
+METRICS_FONT_COLOR = (255, 255, 255)
+METRICS_BACKGROUND_COLOR = (0, 0, 0, 160)
+
+# Settled networks
+# If robots on routes that have settled should stop being simulated while the player is far away
+SETTLE_NETWORKS = True
+# The amount of trips in a row a robot has to make the same way before its route is settled
+NETWORK_SETTLE_CYCLES = 5
+# How many tiles from a route the player has to be for its robots to stop being simulated.
+# More than half of WINDOW_TILES, so that robots are never seen appearing
+NETWORK_WAKE_DISTANCE = 40
+
 # Launcher variables
 # The time in ticks between shots at max speed.
 LAUNCHER_SHOOT_SPEED = 20
@@ -12,12 +12,11 @@
 
 import math
 
-import pygame
 from pygame import Rect
 
 from src import globals as g
 from src import constants as c
-from src.graphics import Graphics
+from src import pathing
 
 
 class Entity(object):
@@ -67,43 +66,38 @@ class Entity(object):
         self.update_sizes = False
 
         self.delete = False
+        # Put the entity in the spatial hash
+        spatial_hash.update(self)
         # Update screen
         g.force_update = True
         
     def update(self, delta_remainder):
         """ Updates the entity location if any of the plus and minus variables are set to True
             "delta_remainder" should be the time since the last update in seconds.
-            
-            moves the enitity one pixel at the time if the delta_remainder is too large
-                (Larger than 1 / movement_speed. if so, it subtracts 1 / movement_speed and uses that as the delta, 
-                because the entity shouldn't move more than one pixel per update because of collision detection)
-        """
-
-        # If the delta value (the time passed) is too large, make sure the entity doesn't move more than one pixel.
-        if self.movement_speed > 0:
-            while delta_remainder > 0:
-                if delta_remainder > (1 / self.movement_speed):
-                    delta = (1 / self.movement_speed)
-                    delta_remainder = (delta_remainder - delta)
-                else:
-                    delta = delta_remainder
-                    delta_remainder = 0
-                # Variables for checking if the entity changed pixel
-                if self.x_move_limit is not None:
-                    self.x += min(self.movement_speed * delta, abs(self.x_move_limit)) * self.dir[0]
-                else:
-                    self.x += self.movement_speed * delta * self.dir[0]
-                if self.y_move_limit is not None:
-                    self.y += min(self.movement_speed * delta, abs(self.y_move_limit)) * self.dir[1]
-                else:
-                    self.y += self.movement_speed * delta * self.dir[1]
 
-                self.collision_check()
+            moves the entity the whole distance it travelled during delta_remainder at once,
+                stopping at the first colliding tile along each axis (see move())
+        """
+        if self.movement_speed > 0 and delta_remainder > 0:
+            distance = self.movement_speed * delta_remainder
+            # Don't move further than the move limits, if there are any
+            if self.x_move_limit is not None:
+                x_distance = min(distance, abs(self.x_move_limit))
+            else:
+                x_distance = distance
+            if self.y_move_limit is not None:
+                y_distance = min(distance, abs(self.y_move_limit))
+            else:
+                y_distance = distance
+            self.move(x_distance * self.dir[0], y_distance * self.dir[1])
 
         if self.update_sizes:
             self.update_sizes = False
             self.width, self.height = g.images[self.image].get_size()
 
+        # Move the entity to the right buckets in the spatial hash if it has changed tile
+        spatial_hash.update(self)
+
         if self.rotates:
             # Rotation logic, which direction is the entity facing and how many degrees should it rotate
             # Uses last angle if the entity is not moving
@@ -142,32 +136,48 @@ class Entity(object):
         if self.delete:
             return "delete"
 
-    def paint(self):
-        """ Paints the entity on the screen
+    def get_image(self):
+        """ Returns the pygame.Surface the entity is painted with, rotated if the entity rotates
         """
+        graphics = g.images[self.image]
         if self.rotates:
-            # Create a key with the current entity string and the angle
-            key = self.image
-            if self.angle != 0:
-                key += str(self.angle)
-            # Check the images dict for a key with the cutrrent entity and rotation
-            if key in g.images:
-                image = g.images[key].get()
-            else:
-                # The images dict doesn't have the current sprite with that rotation, create it
-                g.images[key] = Graphics(pygame.transform.rotate(g.images[self.image].get(), self.angle))
-                image = g.images[key].get()
-        else:
-            image = g.images[self.image].get()
-            
+            if graphics.rotations is None:
+                # Images that aren't marked as rotating in c.IMAGES get their rotations the first time
+                graphics.make_rotations()
+            return graphics.rotations[self.angle // 45 % 8].get()
+        return graphics.get()
+
+    def screen_rect(self):
+        """ Returns a pygame.Rect of where on the screen the entity is painted
+        """
+        image = self.get_image()
+        x, y = g.camera.to_screen(int(self.x), int(self.y))
+        if self.rotates:
+            # Rotated images can be larger, so center them on the entity
+            offset_x, offset_y = g.images[self.image].rotation_offsets[self.angle // 45 % 8]
+            x += offset_x
+            y += offset_y
+        return image.get_rect(topleft=(x, y))
+
+    def paint_key(self):
+        """ Returns something that changes whenever the entity would be painted differently,
+            which rendering.Renderer uses to find the entities that need to be painted again.
+        """
+        return int(self.x), int(self.y), self.image, self.angle
+
+    def paint(self):
+        """ Paints the entity on the screen, if the camera can see it
+
+            returns the pygame.Rect on the screen that was painted, or None if nothing was painted
+        """
+        # Rotated images are larger, so leave some margin
+        if not g.camera.is_visible(self.x - self.width, self.y - self.height, self.width * 3, self.height * 3):
+            return None
         # Actually paint the object
-        if float(int(self.angle / 90.0)) != self.angle / 90.0:
-            # Compensate for rotated entities
-            g.screen.blit(image, (int(self.x) - int(self.width/5.0),
-                          int(self.y) - int(self.height/5.0)))
-        else:
-            g.screen.blit(image, (int(self.x), int(self.y)))
-        
+        rect = self.screen_rect()
+        g.screen.blit(self.get_image(), rect)
+        return rect
+
     def has_moved(self, update=True):
         """ Compares an old x and y value with the current one. 
             If the value has changed, the unit has moved to another pixel and should be redrawn.
@@ -189,24 +199,21 @@ class Entity(object):
         """ 
         return int((self.x + self.width/2) / float(c.TILE_SIZE)), int((self.y + self.height/2) / float(c.TILE_SIZE))
     
+    def corner_tiles(self):
+        """ Returns a set of the coordinates of the tiles that any of the entity's corners are inside of.
+        """
+        return {(int(corner_x) // c.TILE_SIZE, int(corner_y) // c.TILE_SIZE)
+                for corner_x, corner_y in ((self.x, self.y),
+                                           (self.x + self.width, self.y),
+                                           (self.x, self.y + self.height),
+                                           (self.x + self.width, self.y + self.height))}
+
     def corner_in_tile(self, tile):
         """ Checks if any of the entities corners are inside of the specified tile.
             "tile" should be a tiles.Tile object
         """
-        # Get the corners of the entity
-        # And get rects for those corners
-        corner_rects = []
-        for corner in [(self.x, self.y),
-                       (self.x + self.width, self.y),
-                       (self.x, self.y + self.height),
-                       (self.x + self.width, self.y + self.height)]:
-            corner_rects.append(Rect(corner, (1, 1)))
-        
-        if tile.rect().collidelist(corner_rects) != -1:
-            return True
-        else:
-            return False
-        
+        return (tile.x, tile.y) in self.corner_tiles()
+
     def update_collision_rects(self):
         """ Method for creating four pygame Rect object along the sides of the entity for use in collision detection 
         """
@@ -230,42 +237,103 @@ class Entity(object):
                                    self.width - 2,
                                    1)
 
+    def move(self, x_distance, y_distance):
+        """ Moves the entity x_distance and y_distance pixels. Colliding entities move along one axis at the time
+            and stop right before the first colliding tile in the way, so that they slide along walls.
+            Sets self.collided if the entity ran into something.
+        """
+        ran_into_tile = False
+        if self.collides:
+            self.x, tile = self.sweep(0, x_distance)
+            ran_into_tile = tile is not None
+            self.y, tile = self.sweep(1, y_distance)
+            ran_into_tile = ran_into_tile or tile is not None
+        else:
+            self.x += x_distance
+            self.y += y_distance
+
+        # Push the entity out of tiles it was already inside of and keep it inside of the map
+        self.collision_check()
+        if ran_into_tile:
+            self.collided = True
+
+    def sweep(self, axis, distance):
+        """ Finds how far the entity can move "distance" pixels along "axis" (0 for x and 1 for y)
+            before the side it's moving towards runs into a colliding tile.
+            Tiles outside of the map don't collide.
+
+            returns a tuple of the new x or y coordinate and the coordinates of the tile it ran into,
+                or None instead of the coordinates if it didn't run into anything
+        """
+        if axis == 0:
+            position, size, cross_position, cross_size = self.x, self.width, int(self.y), self.height
+            map_size, cross_map_size = g.map.width, g.map.height
+        else:
+            position, size, cross_position, cross_size = self.y, self.height, int(self.x), self.width
+            map_size, cross_map_size = g.map.height, g.map.width
+
+        # The rows (or columns) of tiles that the side of the entity covers, without the corner pixels
+        # just like the strips in collision_check()
+        first_cross = max((cross_position + 1) // c.TILE_SIZE, 0)
+        last_cross = min((cross_position + cross_size - 2) // c.TILE_SIZE, cross_map_size - 1)
+
+        # The columns (or rows) of tiles that the side enters while moving, in the order it enters them
+        if distance > 0:
+            edge = int(position) + size - 1
+            new_edge = int(position + distance) + size - 1
+            lines = range(max(edge // c.TILE_SIZE + 1, 0), min(new_edge // c.TILE_SIZE, map_size - 1) + 1)
+        elif distance < 0:
+            edge = int(position)
+            new_edge = int(position + distance)
+            lines = range(min(edge // c.TILE_SIZE - 1, map_size - 1), max(new_edge // c.TILE_SIZE, 0) - 1, -1)
+        else:
+            return position, None
+
+        collides = g.map.collides
+        map_height = g.map.height
+        for line in lines:
+            for cross_line in range(first_cross, last_cross + 1):
+                if axis == 0:
+                    tile = (line, cross_line)
+                else:
+                    tile = (cross_line, line)
+                if collides[tile[0] * map_height + tile[1]]:
+                    # Stop with the side on the last pixel before the tile
+                    if distance > 0:
+                        return line * c.TILE_SIZE - size, tile
+                    else:
+                        return (line + 1) * c.TILE_SIZE, tile
+        return position + distance, None
+
     def collision_check(self):
         """ Method for checking if the entity has run into a tree or something
             and move it back a pixel if it has
         """
         if self.wall_collides:
             # Move the entity inside of the window (border collision)
-            entity_rect = Rect(self.x, self.y, self.width,self.height)
-            window_rect = Rect(0, 0, g.width * c.TILE_SIZE, g.height * c.TILE_SIZE)
-            if not window_rect.contains(entity_rect):
-                entity_rect.clamp_ip(window_rect)
-                self.x = entity_rect.left
-                self.y = entity_rect.top
+            max_x = g.width * c.TILE_SIZE - self.width
+            max_y = g.height * c.TILE_SIZE - self.height
+            if not (0 <= int(self.x) <= max_x and 0 <= int(self.y) <= max_y):
+                self.x = min(max(int(self.x), 0), max_x)
+                self.y = min(max(int(self.y), 0), max_y)
 
         collided = False
         if self.collides:
-            # Make sure collision rectangles are up to date
-            self.update_collision_rects()
-            # Get the tile the entity is standing on
-            tile_pos = self.get_tile()
-            checked_tiles = []
-            # Loop through a 3x3 tile square around the entity, to not check the entire map
-            for i in range(tile_pos[0] - 1, tile_pos[0] + 2):
-                for j in range(tile_pos[1] - 1, tile_pos[1] + 2):
-                    try:
-                        if c.IMAGES[g.map[i][j].type].collides:
-                            checked_tiles.append(g.map[i][j].rect())
-                    except IndexError:
-                        # That index was apparently outside of the map
-                        pass
-
-            # Check if each of the zones collides with any of the tiles
-            # If so, move it in the appropriate direction, specified in update_collision_rects() as the keys
-            for rect in self.rects:
-                if self.rects[rect].collidelist(checked_tiles) != -1:
-                    self.x += rect[0]
-                    self.y += rect[1]
+            x = int(self.x)
+            y = int(self.y)
+            # The one pixel wide strips along each side of the entity, as (left, top, width, height).
+            # The keys are which direction to move the entity if that side collides,
+            # the same as the rects in update_collision_rects()
+            strips = (((-1, 0), (x + self.width - 1, y + 1, 1, self.height - 2)),  # Right
+                      ((1, 0), (x, y + 1, 1, self.height - 2)),  # Left
+                      ((0, 1), (x + 1, y, self.width - 2, 1)),  # Top
+                      ((0, -1), (x + 1, y + self.height - 1, self.width - 2, 1)))  # Bottom
+            # Check each strip against the collision bitmap of the map, which only takes
+            # one array read per tile the strip touches
+            for direction, (left, top, width, height) in strips:
+                if strip_collides(left, top, width, height):
+                    self.x += direction[0]
+                    self.y += direction[1]
                     collided = True
 
         self.collided = collided
@@ -404,258 +472,27 @@ class PathingEntity(FollowingEntity):
         self.deliver_timer = -1
         self.come_home_timer = None
 
-    def _heuristic_cost_estimate(self, start, end):
-        return 10 * (abs(start[0] - end[0]) + abs(start[1] - end[1]))
-
     def pathfind(self, end):
-        """ Finds a path from start to end tiles using A* algorithm
-            "start" and "end" are tuples with x and y coordinates of a tile
+        """ Finds a path from the current tile to the end tile using the A* algorithm in pathing.py
+            Paths that have been found before are taken from the path cache if the map hasn't changed there.
+            "end" is a tuple with x and y coordinates of a tile
 
             returns True if it succeded and False if it couldn't find a path
         """
-        start = self.get_tile()
-        # The open_dict and closed_dict both follow the format:
-        # (key_x, key_y): [f, g, h, (came_from_x, came_from_y)]
-        # F, G and H. G is the length to the start tile, H is the Heuristics
-        # estimate of the distance to the end tile and F = G + H
-        if type(start) != tuple or type(end) != tuple:
-            raise Exception("Value passed to PathingEntity.pathfind() is not tuple")
-
-        # The open dictionary is a dictionary keeping the currently checkable tiles
-        # The starting tile is identified as not having a came_from-tuple.
-        open_dict = {start: [self._heuristic_cost_estimate(start, end), 0,
-                             self._heuristic_cost_estimate(start, end)]}
-        # The closed dictionary is a dicionary keeping the currently checked tiles
-        closed_dict = {}
-
-        current = None
-        while len(open_dict.keys()) > 0:
-            lowest_value = None
-            # Get the lowest value
-            for key in open_dict.keys():
-                value = open_dict[key][0]
-                if lowest_value is None:
-                    lowest_value = value
-                    current = key
-                else:
-                    if value < lowest_value:
-                        lowest_value = value
-                        current = key
-            # Move current from the open dictionary to the closed one
-            closed_dict[current] = open_dict[current]
-            del open_dict[current]
-
-            # If we're done here
-            deliver_tile = None
-            if g.get_img(*end).collides and current != end:
-                # Find a tile next to the target tile to stand on if it collides
-                if (g.in_map(current[0] + 1, current[1]) and
-                        (current[0] + 1, current[1]) == end):
-                    deliver_tile = (current[0] + 1, current[1])
-                elif (g.in_map(current[0] - 1, current[1]) and
-                        (current[0] - 1, current[1]) == end):
-                    deliver_tile = (current[0] - 1, current[1])
-                elif (g.in_map(current[0], current[1] + 1) and
-                        (current[0], current[1] + 1) == end):
-                    deliver_tile = (current[0], current[1] + 1)
-                elif (g.in_map(current[0], current[1] - 1) and
-                        (current[0], current[1] - 1) == end):
-                    deliver_tile = (current[0], current[1] - 1)
-            elif current == end:
-                deliver_tile = current
-
-            if deliver_tile is not None:
-                # closed_dict[current]
-                full_path = []
-                while current != start:
-                    full_path.append(current)
-                    current = closed_dict[current][3]
-                full_path.reverse()
-                self.deliver_tile = deliver_tile
-                self.path = full_path
-                self.next_target_tile()
-                return True
-
-                # # Old version
-                # if done is True:
-                #     full_path = []
-                #     self.deliver_tile = deliver_tile
-                #     while len(closed_dict[current]) > 1:
-                #         full_path.append(current)
-                #         current = closed_dict[current][1]
-                #     full_path.reverse()
-                #     self.path = full_path
-                #     self.next_target_tile()
-                #     self.home_tile = self.get_tile()
-                #     return
-
-            # Move through all neighbours
-            for i in range(current[0]-1, current[0]+2):
-                for j in range(current[1]-1, current[1]+2):
-                    neighbour = (i, j)
-                    if 0 <= neighbour[0] < len(g.map) and 0 <= neighbour[1] < len(g.map[0]):
-
-                        # Get the G score, the cost to go back to the start
-                        if neighbour[0] == current[0]:
-                            if neighbour[1] == current[1]:
-                                continue
-                            else:
-                                g_score = closed_dict[current][1] + 10
-                        else:
-                            if neighbour[1] == current[1]:
-                                g_score = closed_dict[current][1] + 10
-                            else:
-                                # Make sure the pathfinding doesn't try to go through blocks diagonally.
-                                if (g.get_img(neighbour[0], current[1]).collides and
-                                        g.get_img(current[0], neighbour[1]).collides):
-                                    # If the blocks on either side of the diagonal walk is collidable, skip this one
-                                    closed_dict[neighbour] = None
-                                    continue
-
-                                # If it can travel diagonally, give it a cost of the square root of two.
-                                g_score = closed_dict[current][1] + 14
-
-                        if c.IMAGES[g.map[neighbour[0]][neighbour[1]].type].collides is False:
-                            # Check if this neighbour can be added the the open_dict and do so if so
-                            if neighbour not in closed_dict.keys():
-                                if neighbour not in open_dict.keys() or g_score < open_dict[neighbour][1]:
-                                    h_score = self._heuristic_cost_estimate(neighbour, end)
-                                    f_score = g_score + h_score
-                                    open_dict[neighbour] = [f_score, g_score, h_score, current]
-                        else:
-                            closed_dict[neighbour] = None
+        result = pathing.path_cache.find_path(self.get_tile(), end)
+        if result is not None:
+            self.follow_path(*result)
+            return True
         self.path = []
         self.stop_moving()
         return False
 
-    def goods_pathfind(self, target_goods):
-        """ Finds a path from the start tile, (the current tile of the entity) to the nearest factory tile that
-            can recieve the passed-in goods type.
-            "goods" should be a string with the type of goods that the entity will be carrying.
-
-            returns True if a suitable tile was found and False if no suitable tile was found
+    def follow_path(self, path, deliver_tile):
+        """ Starts walking along path, a list of tile coordinates not including the current tile,
+            that ends next to or on deliver_tile.
         """
-
-        start = self.get_tile()
-        # The open_dict and closed_dict both follow the format:
-        # (key_x, key_y): [g, (came_from_x, came_from_y)]
-        # This is a simplified version of the pathfind function. It doesn't use heuristics because it doesn't
-        # know where to go yet. It only uses the G value, which is the distance to the tile it came from.
-        if type(start) != tuple:
-            raise Exception("Value given by self.get_tile() to PathingEntity.goods_pathfind() is not tuple")
-
-        # The open dictionary is a dictionary keeping the currently checkable tiles
-        # The starting tile is identified as not having a came_from-tuple.
-        open_dict = {start: [0]}
-        # The closed dictionary is a dicionary keeping the currently checked tiles
-        closed_dict = {}
-
-        current = None
-        while len(open_dict.keys()) > 0:
-            lowest_value = None
-            # Get the lowest value
-            for key in open_dict.keys():
-                value = open_dict[key][0]
-                if lowest_value is None:
-                    lowest_value = value
-                    current = key
-                elif value < lowest_value:
-                    lowest_value = value
-                    current = key
-            # Move current from the open dictionary to the closed one
-            closed_dict[current] = open_dict[current]
-            del open_dict[current]
-
-            # If we're done here
-            done = False
-            deliver_tiles = []
-            # This code block makes sure the items are delivered to the tile next to the tile instead of diagonally
-
-            if (g.in_map(current[0]+1, current[1]) and
-                    g.get_img(current[0]+1, current[1]).factory_input):
-                deliver_tiles.append((current[0]+1, current[1]))
-            elif (g.in_map(current[0]-1, current[1]) and
-                    g.get_img(current[0]-1, current[1]).factory_input):
-                deliver_tiles.append((current[0]-1, current[1]))
-            elif (g.in_map(current[0], current[1]+1) and
-                    g.get_img(current[0], current[1]+1).factory_input):
-                deliver_tiles.append((current[0], current[1]+1))
-            elif (g.in_map(current[0], current[1]-1) and
-                    g.get_img(current[0], current[1]-1).factory_input):
-                deliver_tiles.append((current[0], current[1]-1))
-            if deliver_tiles:
-                for deliver_tile in deliver_tiles:
-                    try:
-                        for good_name in list(g.map[deliver_tile[0]][deliver_tile[1]].requests.keys()):
-                            if good_name == target_goods:
-                                if g.map[deliver_tile[0]][deliver_tile[1]].requests[target_goods] > 0:
-                                    done = True
-                                    g.map[deliver_tile[0]][deliver_tile[1]].requests[target_goods] -= 1
-                                    break  # Break out of the goods for loop, not the entire while loop
-                        if done:
-                            break
-                    except AttributeError:
-                        pass
-
-            if done is True:
-                full_path = []
-                self.deliver_tile = deliver_tile
-                try:
-                    while current != start:
-                        full_path.append(current)
-                        current = closed_dict[current][1]
-                except:
-                    print(closed_dict)
-                    print(full_path)
-                    # Trying to understand the heisenbug! D:
-                    import pdb, sys
-                    e, m, tb = sys.exc_info()
-                    pdb.post_mortem(tb)
-
-                full_path.reverse()
-                self.path = full_path
-                self.next_target_tile()
-                self.home_tile = self.get_tile()
-                return True
-
-            # Move through all neighbours
-            for i in range(current[0]-1, current[0]+2):
-                for j in range(current[1]-1, current[1]+2):
-                    neighbour = (i, j)
-                    if 0 <= neighbour[0] < len(g.map) and 0 <= neighbour[1] < len(g.map[0]):
-
-                        # Get the G score, the cost to go back to the start
-                        if neighbour[0] == current[0]:
-                            if neighbour[1] == current[1]:
-                                continue
-                            else:
-                                g_score = closed_dict[current][0] + 10
-                        else:
-                            if neighbour[1] == current[1]:
-                                g_score = closed_dict[current][0] + 10
-                            else:
-                                # Make sure the pathfinding doesn't try to go through blocks diagonally.
-                                if (g.get_img(neighbour[0], current[1]).collides and
-                                        g.get_img(current[0], neighbour[1]).collides):
-                                    # If the blocks on either side of the diagonal walk is collidable, skip this one
-                                    if neighbour not in closed_dict:
-                                        closed_dict[neighbour] = None
-                                    continue
-
-                                # If it can travel diagonally, give it a cost of the square root of two.
-                                g_score = closed_dict[current][0] + 14
-
-                        if c.IMAGES[g.map[neighbour[0]][neighbour[1]].type].collides is False or neighbour == start:
-                        # Check if this neighbour can be added the the open_dict and do so if so
-                            if neighbour not in closed_dict.keys():
-                                if neighbour not in open_dict.keys() or g_score < open_dict[neighbour][0]:
-                                    open_dict[neighbour] = [g_score, current]
-                        else:
-                            if neighbour not in closed_dict.keys() and neighbour not in open_dict.keys():
-                                closed_dict[neighbour] = None
-        self.path = []
-        self.stop_moving()
-        return False
+        self.path, self.deliver_tile = path, deliver_tile
+        self.next_target_tile()
 
     def update(self, time_diff):
         """ Calls the super update function as well as check for if the package should be turned into a tile.
@@ -663,9 +500,9 @@ class PathingEntity(FollowingEntity):
         if self.target_coords == [int(self.x), int(self.y)]:
             self.next_target_tile()
         if self.target_tile is not None:
-            if (g.get_img(*self.target_tile).collides or
-                    (g.get_img(self.get_tile()[0], self.target_tile[1]).collides and
-                     g.get_img(self.target_tile[0], self.get_tile()[1]).collides)):
+            if (g.map.collides_at(*self.target_tile) or
+                    (g.map.collides_at(self.get_tile()[0], self.target_tile[1]) and
+                     g.map.collides_at(self.target_tile[0], self.get_tile()[1]))):
                 if len(self.path) > 0:
                     if self.deliver_tile:
                         if not self.pathfind(self.deliver_tile):
@@ -712,18 +549,95 @@ class PathingEntity(FollowingEntity):
             make sure the tile it was travelling to requests new resources
         """
         if self.home_tile and self.deliver_tile != self.home_tile:
-            g.map[self.deliver_tile[0]][self.deliver_tile[1]].requests[self.goods] += 1
+            g.map[self.deliver_tile[0]][self.deliver_tile[1]].change_request(self.goods, 1)
 
 
 def free_of_entities(tile):
     """ A function to check if any of the entities has any of its corners inside the specified tile.
     """
-    # Loop through all normal entities.
-    for entity in g.entity_list:
-        if entity.corner_in_tile(tile):
-            return False
-    # Loop through all special entites
-    for entity in list(g.special_entity_list.values()):
-        if entity.corner_in_tile(tile):
-            return False
-    return True
\ No newline at end of file
+    return not spatial_hash.entities_in((tile.x, tile.y))
+
+
+def strip_collides(left, top, width, height):
+    """ Checks if the pixel rectangle specified touches any colliding tile.
+        Tiles outside of the map don't collide.
+    """
+    if width <= 0 or height <= 0:
+        return False
+    collides = g.map.collides
+    map_height = g.map.height
+    # The tiles under the first and last pixel of the rectangle, clamped to the map
+    first_x = max(left // c.TILE_SIZE, 0)
+    last_x = min((left + width - 1) // c.TILE_SIZE, g.map.width - 1)
+    first_y = max(top // c.TILE_SIZE, 0)
+    last_y = min((top + height - 1) // c.TILE_SIZE, map_height - 1)
+    for i in range(first_x, last_x + 1):
+        for j in range(first_y, last_y + 1):
+            if collides[i * map_height + j]:
+                return True
+    return False
+
+
+class SpatialHash(object):
+    """ Keeps track of which tiles the corners of every entity are inside of, so that finding the entities
+        on a tile doesn't need to loop through all of them. Entities update their own position in it
+        when they move, and have to be removed from it when they are deleted.
+    """
+    def __init__(self):
+        # {(x, y): set of the entities with a corner in that tile}
+        self.buckets = {}
+        # {entity: set of the tiles it has a corner in}
+        self.entity_tiles = {}
+
+    def clear(self):
+        """ Forgets all entities.
+        """
+        self.buckets.clear()
+        self.entity_tiles.clear()
+
+    def update(self, entity):
+        """ Adds the entity to the hash, or moves it if it has changed tiles since the last time.
+        """
+        tiles = entity.corner_tiles()
+        old_tiles = self.entity_tiles.get(entity)
+        if tiles == old_tiles:
+            return
+        if old_tiles is not None:
+            self._remove_from_buckets(entity, old_tiles - tiles)
+            tiles_to_add = tiles - old_tiles
+        else:
+            tiles_to_add = tiles
+        for tile in tiles_to_add:
+            self.buckets.setdefault(tile, set()).add(entity)
+        self.entity_tiles[entity] = tiles
+
+    def remove(self, entity):
+        """ Removes the entity from the hash. Does nothing if it isn't in it.
+        """
+        if entity in self.entity_tiles:
+            self._remove_from_buckets(entity, self.entity_tiles.pop(entity))
+
+    def _remove_from_buckets(self, entity, tiles):
+        for tile in tiles:
+            bucket = self.buckets[tile]
+            bucket.discard(entity)
+            # Don't keep empty buckets around
+            if not bucket:
+                del self.buckets[tile]
+
+    def entities_in(self, tile):
+        """ Returns a set of the entities with a corner inside the tile at the coordinates "tile".
+            The set shouldn't be changed.
+        """
+        return self.buckets.get(tile, ())
+
+
+# The spatial hash with all entities in it
+spatial_hash = SpatialHash()
+
+
+def delete_special_entity(name):
+    """ Removes the entity with the key "name" from g.special_entity_list, and from the spatial hash,
+        so that it doesn't keep the tile it was on from being built on.
+    """
+    spatial_hash.remove(g.special_entity_list.pop(name))
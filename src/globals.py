@@ -11,7 +11,10 @@
 from src import constants as c, graphics
 
 # Making some variables that should be available for use in all modules
+# map is a grid.Grid holding all the tiles, created by maps.load_map()
 map = width = height = player_start_x = player_start_y = screen = None
+# camera is the camera.Camera deciding which part of the map is shown in the window, created by main.main()
+camera = None
 images = {}
 
 # If the map should be rerendered next time.
@@ -27,19 +30,11 @@ non_entity_list = {}
 
 images = graphics.load_graphics()
 
-# List of tiles that should be ticked (tick function called).
-# This is because all tiles shouldn't be ticked, for performance.
-# Should follow the format [[x, y], [x, y]]
-tick_tiles = []
-
-# map_screen_buffer is a surface to which the map is painted when it is 
-# updated so that the screen isn't rerendered every frame 
-map_screen_buffer = None
-# If the map should be rerendered
+# If the map should be rerendered (all painted chunks in maps.chunk_cache are thrown away)
 update_map = True
-# Has a microtile (tile constructed from several smaller pieces, dependent on surrounding tiles)
-# been changed, so the microtiles need to be updated?
-update_microtiles = True
+# Set of (x, y) tile coordinates that have changed since the map was last painted.
+# Only the chunks with these are repainted, unless update_map asks for the whole map to be rerendered.
+dirty_tiles = set()
 
 # The position of menus. Is carried over between different times that the menu created.
 menu_coords = ["Empty", "Empty"]
@@ -81,7 +76,8 @@ def in_map(x, y):
 
 
 def get_img(x, y):
-    """ Gets the Img class from constants.IMAGES of the tile at x, y.
-        returns an Img object
+    """ Gets the tile_types.TileType of the tile at x, y, which has all the attributes of the
+        Img class from constants.IMAGES. Reads the type straight from the arrays in the map grid.
+        returns a TileType object
     """
-    return c.IMAGES[map[x][y].type]
+    return map.type_info_at(x, y)
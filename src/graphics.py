@@ -8,6 +8,8 @@
     
     Module containing the Graphics class.
     Uses pygame image objects.
+    Once the display exists, convert_graphics() converts all images to the format of the display and packs
+    the images the size of a tile into atlases, which makes painting them much faster.
 """
 import os
 import sys
@@ -17,6 +19,7 @@ import pygame
 
 sys.path.append(os.path.join(os.getcwd(), "sys"))
 from src import constants as c
+from src import tile_types
 
 
 class Graphics(object):
@@ -32,26 +35,146 @@ class Graphics(object):
             #     print(os.path.join(os.getcwd(), c.RES_FOLDER, c.IMAGES[name].png))
             self.image = pygame.image.load(os.path.join(os.getcwd(), c.RES_FOLDER, c.IMAGES[name].png))
         elif type(name) == pygame.Surface:
+            # Images made while the game is running (like rotated images and microtiles) are converted right away
+            if pygame.display.get_surface() is not None:
+                name = _convert(name)
             self.image = name 
+        # The Graphics objects of the image rotated in the 8 directions, starting with the image itself and
+        # going 45 degrees counterclockwise each step, so that an angle has the index angle // 45 % 8.
+        # None until make_rotations() is called
+        self.rotations = None
+        # How far the rotated images should be moved to be painted centered on where the image is, by index
+        self.rotation_offsets = None
+        # The names of the rotated images in the images dictionary, by index, if they are put there
+        self.rotation_names = None
     
     def get(self):
         """ returns the contained image
         """
         return self.image
     
+    def make_rotations(self, name=None, images=None):
+        """ Makes the rotated versions of the image for all 8 directions.
+            If "name" and "images" are given, the rotated images are also put in the images dictionary,
+            named after the image and the angle (example: "launcher90"), so that tiles can use them.
+        """
+        width, height = self.get_size()
+        self.rotations = [self]
+        self.rotation_offsets = [(0, 0)]
+        self.rotation_names = [name]
+        for angle in range(45, 360, 45):
+            rotated = Graphics(pygame.transform.rotate(self.get(), angle))
+            rotated_width, rotated_height = rotated.get_size()
+            self.rotations.append(rotated)
+            self.rotation_offsets.append(((width - rotated_width) // 2, (height - rotated_height) // 2))
+            if name is not None:
+                self.rotation_names.append(name + str(angle))
+                images[name + str(angle)] = rotated
+
     def get_size(self):
         """ returns a tuple containing the width and height of the image 
         """
         return self.get().get_width(), self.get().get_height()
 
 
+def make_microtile_images(name, images):
+    """ Puts all shapes of the microtile "name" in the images dictionary, named after the shape
+        (example: "water11111111"). Every shape is made out of four corners from the quartets of the microtile,
+        as c.MICROTILE_LEGEND says. See doc/microtiles.txt
+    """
+    for shape in set(tile_types.MICROTILE_SHAPES):
+        new_image = pygame.Surface((c.TILE_SIZE, c.TILE_SIZE))
+        # Defines which quartet is being manipulated, clockwise, starting with top left
+        for pos, j in enumerate(range(0, 7, 2)):
+            corner = shape[j-1] + shape[j] + shape[j+1]
+            quartet_number, rotation, mirror = c.MICROTILE_LEGEND[corner]
+            # Find the corresponding quartet
+            quartet = images[c.IMAGES[name].microtiles[quartet_number]].get()
+            if mirror:
+                # Mirror the quartet horizontally
+                quartet = pygame.transform.flip(quartet, True, False)
+            if (rotation - pos*90) != 0:
+                quartet = pygame.transform.rotate(quartet, rotation - pos*90)
+            new_image.blit(quartet, (0, 0))
+        images[name + shape] = Graphics(new_image)
+
+
+def _is_opaque(surface):
+    """ Returns True if the surface has no transparent or partly transparent pixels
+    """
+    # The mask has the pixels that are fully opaque set
+    return pygame.mask.from_surface(surface, 254).count() == surface.get_width() * surface.get_height()
+
+
+def _convert(surface):
+    """ Returns a copy of the surface in the format of the display, with per pixel alpha if it has any transparency
+    """
+    if _is_opaque(surface):
+        return surface.convert()
+    return surface.convert_alpha()
+
+
+def _make_atlas(images):
+    """ Paints the images, which should all be the size of a tile, next to each other on one surface in the format
+        of the display and makes the Graphics objects use their part of it.
+        "images" should be a list of Graphics objects that are either all opaque or all have transparent pixels.
+    """
+    columns = c.ATLAS_COLUMNS
+    rows = (len(images) + columns - 1) // columns
+    atlas = pygame.Surface((columns * c.TILE_SIZE, rows * c.TILE_SIZE))
+    opaque = _is_opaque(images[0].get())
+    if opaque:
+        atlas = atlas.convert()
+    else:
+        atlas = atlas.convert_alpha()
+        atlas.fill((0, 0, 0, 0))
+
+    for i, graphics in enumerate(images):
+        rect = pygame.Rect((i % columns) * c.TILE_SIZE, (i // columns) * c.TILE_SIZE, c.TILE_SIZE, c.TILE_SIZE)
+        if opaque:
+            atlas.blit(graphics.get(), rect)
+        else:
+            # Copy the pixels with their alpha instead of blending them with the empty atlas
+            atlas.blit(_convert(graphics.get()), rect, special_flags=pygame.BLEND_RGBA_MAX)
+        graphics.image = atlas.subsurface(rect)
+
+
+def convert_graphics(images):
+    """ Converts all images in the "images" dictionary to the format of the display, so that they don't have to
+        be converted every time they are painted. The images the size of a tile are packed into two atlases,
+        one for opaque images and one for images with transparent pixels.
+        Should be called once the display mode has been set.
+    """
+    opaque_tiles = []
+    transparent_tiles = []
+    for graphics in images.values():
+        image = graphics.get()
+        if image.get_size() != (c.TILE_SIZE, c.TILE_SIZE):
+            graphics.image = _convert(image)
+        elif _is_opaque(image):
+            opaque_tiles.append(graphics)
+        else:
+            transparent_tiles.append(graphics)
+    for atlas_images in (opaque_tiles, transparent_tiles):
+        if atlas_images:
+            _make_atlas(atlas_images)
+
+
 def load_graphics():
     """ Creates a dictionary with the keys from the constants.py IMAGES dictionary keys
         and a Graphics object created using that key.
+        Images that rotate also get their rotated versions, see Graphics.make_rotations(),
+        and microtiles get all their shapes, see make_microtile_images().
         
         returns that dictionary
     """
     images = {}
     for key in list(c.IMAGES.keys()):
         images[key] = Graphics(key)
+    # Make the rotated images and the microtile shapes once, instead of while painting
+    for key in list(c.IMAGES.keys()):
+        if c.IMAGES[key].rotates:
+            images[key].make_rotations(key, images)
+        if c.IMAGES[key].microtiles is not None:
+            make_microtile_images(key, images)
     return images
\ No newline at end of file
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/grid.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the Grid class, which is what g.map is.
+    The grid keeps the type and image of every tile as integer ids in flat arrays, and only keeps
+    actual Tile objects for the tiles that need their own state, like factories, multi-tiles and
+    tiles that evolve. It can still be used like the old list of lists, g.map[x][y], which gives
+    a temporary Tile object for tiles that don't have one.
+"""
+from array import array
+from random import choice
+
+from src import tiles
+from src.tile_types import TYPE_NAMES, TYPES, IMAGE_NAMES, image_id
+
+
+def needs_object(tile):
+    """ Returns True if the tile has state of its own that can't be stored in the arrays
+    """
+    return type(tile) is not tiles.Tile or tile.timer is not None
+
+
+class Grid(object):
+    """ The tile map. Indexed with g.map[x][y] like a list of lists, but stores
+        tile type ids and image ids in arrays and Tile objects only in the self.tiles dict.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # Flat arrays with one value per tile. The value of tile x, y is at index x * height + y
+        self.types = array("H", [0]) * (width * height)
+        self.images = array("H", [0]) * (width * height)
+        # One byte per tile that is 1 if the tile collides with entities and 0 if it doesn't,
+        # and one that is 1 if something can be placed on the tile. Kept up to date by set_tile()
+        self.collides = bytearray(width * height)
+        self.placeable = bytearray(width * height)
+        # {(x, y): Tile} for the tiles that need their own object
+        self.tiles = {}
+
+    def wrap(self, x, y):
+        """ Returns the coordinates x, y with negative values counting from the other end of the map,
+            like in a list. Raises an IndexError if the tile is outside of the map.
+        """
+        if x < 0:
+            x += self.width
+        if y < 0:
+            y += self.height
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError("Tile " + str((x, y)) + " is outside of the map")
+        return x, y
+
+    def index(self, x, y):
+        """ Returns the index of the tile at x, y in the arrays.
+        """
+        x, y = self.wrap(x, y)
+        return x * self.height + y
+
+    def type_at(self, x, y):
+        """ Returns the type string of the tile at x, y, or None if it hasn't been created yet.
+        """
+        return TYPE_NAMES[self.types[self.index(x, y)]]
+
+    def type_info_at(self, x, y):
+        """ Returns the tile_types.TileType of the tile at x, y, or None if it hasn't been created yet.
+        """
+        return TYPES[self.types[self.index(x, y)]]
+
+    def collides_at(self, x, y):
+        """ Returns True if the tile at x, y collides with entities
+        """
+        return self.collides[self.index(x, y)] == 1
+
+    def placeable_at(self, x, y):
+        """ Returns True if something can be placed on the tile at x, y
+        """
+        return self.placeable[self.index(x, y)] == 1
+
+    def image_at(self, x, y):
+        """ Returns the name of the image the tile at x, y is painted with.
+        """
+        x, y = self.wrap(x, y)
+        if (x, y) in self.tiles:
+            return self.tiles[(x, y)].get_image()
+        return IMAGE_NAMES[self.images[x * self.height + y]]
+
+    def get_tile(self, x, y):
+        """ Returns the Tile at x, y. Tiles without state of their own get a new Tile object every time,
+            so changing it doesn't change the map. Returns None if there is no tile there yet.
+        """
+        x, y = self.wrap(x, y)
+        if (x, y) in self.tiles:
+            return self.tiles[(x, y)]
+        index = x * self.height + y
+        if self.types[index] == 0:
+            return None
+        # Make the tile without calling __init__, since that would start timers
+        tile = tiles.Tile.__new__(tiles.Tile)
+        tile.type = TYPE_NAMES[self.types[index]]
+        tile.type_info = TYPES[self.types[index]]
+        tile.x = x
+        tile.y = y
+        tile.timer = None
+        tile.image = IMAGE_NAMES[self.images[index]]
+        return tile
+
+    def set_tile(self, x, y, tile):
+        """ Puts tile at x, y. The type and image go into the arrays, and the tile itself
+            is only kept if it needs to be.
+        """
+        x, y = self.wrap(x, y)
+        index = x * self.height + y
+        self.types[index] = tile.type_info.id
+        self.images[index] = image_id(tile.image)
+        self.collides[index] = tile.type_info.collides
+        self.placeable[index] = tile.type_info.placeable
+        if needs_object(tile):
+            self.tiles[(x, y)] = tile
+        elif (x, y) in self.tiles:
+            del self.tiles[(x, y)]
+
+    def fill(self, type_ids):
+        """ Sets the type of every tile at once, much faster than making them one at a time.
+            "type_ids" should be a list of tile type ids in the order of the arrays (x * height + y).
+            Only plain tile types (see tile_types.TileType.plain) can be filled in this way. Tiles with id 0 are
+            left empty, so that the other types can be made with tiles.make_tile() afterwards.
+        """
+        # The ids of the images every type can get, and if it collides and is placeable
+        variant_ids = [[0]] + [[image_id(image) for image in tile_type.variants] for tile_type in TYPES[1:]]
+        collides = [0] + [int(bool(tile_type.collides)) for tile_type in TYPES[1:]]
+        placeable = [0] + [int(bool(tile_type.placeable)) for tile_type in TYPES[1:]]
+
+        self.types = array("H", type_ids)
+        self.images = array("H", [choice(variant_ids[type_id]) if len(variant_ids[type_id]) > 1
+                                  else variant_ids[type_id][0] for type_id in type_ids])
+        self.collides = bytearray([collides[type_id] for type_id in type_ids])
+        self.placeable = bytearray([placeable[type_id] for type_id in type_ids])
+        self.tiles = {}
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, x):
+        return _Column(self, x)
+
+
+class _Column(object):
+    """ A column of the grid, so that g.map[x][y] works like it did on a list of lists.
+    """
+    def __init__(self, grid, x):
+        if not -grid.width <= x < grid.width:
+            raise IndexError("Column " + str(x) + " is outside of the map")
+        self.grid = grid
+        self.x = x
+
+    def __len__(self):
+        return self.grid.height
+
+    def __getitem__(self, y):
+        return self.grid.get_tile(self.x, y)
+
+    def __setitem__(self, y, tile):
+        self.grid.set_tile(self.x, y, tile)
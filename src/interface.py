@@ -18,6 +18,8 @@ import src.constants as c
 from src import globals as g
 from src import tiles
 from src import maps
+from src import entities
+from src import logistics
 
 
 def key_reconfig():
@@ -29,8 +31,7 @@ def key_reconfig():
     invalid_key_timer = 0
     new_keys = []
     
-    transparent_surface = pygame.Surface((g.width*c.TILE_SIZE,
-                                          g.height*c.TILE_SIZE)).convert_alpha()
+    transparent_surface = pygame.Surface(g.screen.get_size()).convert_alpha()
     transparent_surface.fill((0, 0, 0, 150))
     
     font = pygame.font.Font("freesansbold.ttf", 20)
@@ -87,8 +88,8 @@ def key_reconfig():
             text_surface = font.render(c.CONFIG_KEYS_TEXT_PREFIX +
                                        g.key_list[len(new_keys)][2],
                                        True, c.CONFIG_KEYS_FONT_COLOR)
-            # Draw the map buffer
-            g.screen.blit(g.map_screen_buffer, (0, 0))
+            # Draw the map
+            maps.chunk_cache.paint(g.camera)
             # Draw entities
             for entity in g.entity_list:
                 entity.paint()
@@ -251,23 +252,24 @@ class Menu(object):
     def update_position(self):
         """ Updates the position of the Menu based on where the player is.
         """
-        player_x = g.special_entity_list["player"].x
-        player_y = g.special_entity_list["player"].y
+        # Menus are painted in screen coordinates, so use where the player is on the screen
+        player_x, player_y = g.camera.to_screen(g.special_entity_list["player"].x,
+                                                g.special_entity_list["player"].y)
 
         # Put the target variable in the end of the screen the player isn't in.
         # X Coordinate
-        if player_x > g.width * c.TILE_SIZE / 3.0 * 2.0:
+        if player_x > g.camera.width / 3.0 * 2.0:
             g.menu_coords[0] = c.BORDER_MARGINS
-        elif player_x < g.width * c.TILE_SIZE / 3.0:
-            g.menu_coords[0] = g.width * c.TILE_SIZE - self.background_width - c.BORDER_MARGINS
+        elif player_x < g.camera.width / 3.0:
+            g.menu_coords[0] = g.camera.width - self.background_width - c.BORDER_MARGINS
         elif g.menu_coords[0] is "Empty":
             g.menu_coords[0] = c.BORDER_MARGINS
 
         # Y Coordinate
-        if player_y > g.height * c.TILE_SIZE / 3.0 * 2.0:
+        if player_y > g.camera.height / 3.0 * 2.0:
             g.menu_coords[1] = c.BORDER_MARGINS
-        elif player_y < g.height * c.TILE_SIZE / 3.0:
-            g.menu_coords[1] = g.height * c.TILE_SIZE - self.background_height - c.BORDER_MARGINS
+        elif player_y < g.camera.height / 3.0:
+            g.menu_coords[1] = g.camera.height - self.background_height - c.BORDER_MARGINS
         elif g.menu_coords[1] is "Empty":
             g.menu_coords[1] = c.BORDER_MARGINS
 
@@ -410,9 +412,10 @@ def _set_target_tile(good):
                 print("No change")
         else:
             g.map[x][y].good_targets[good] = tuple(g.tile_target_selection)
+            logistics.dispatcher.target_changed(good)
         g.special_entity_list["player"].browsing_menu = False
         g.tile_target_selection = None
-        del g.special_entity_list["tile_target"]
+        entities.delete_special_entity("tile_target")
         return True
     else:
         return False
@@ -454,13 +457,15 @@ def _regenerate_map():
         g.force_update = True
 
     for i in range(len(g.entity_list)-1, -1, -1):
+        entities.spatial_hash.remove(g.entity_list[i])
         del g.entity_list[i]
     for key in list(g.special_entity_list.keys())[:]:
         if key != "player":
-            del g.special_entity_list[key]
+            entities.delete_special_entity(key)
         g.special_entity_list["player"].x = g.player_start_x
         g.special_entity_list["player"].y = g.player_start_y
         g.special_entity_list["player"].following_entity = None
+    entities.spatial_hash.update(g.special_entity_list["player"])
     g.menu_selection = [0, 0]
     return return_value
 
@@ -56,6 +56,7 @@ def event_check():
                 # Loop backwards through the g.entity_list
                 for i in range(len(g.entity_list) - 1, -1, -1):
                     if type(g.entity_list[i]) == units.Beetle:
+                        entities.spatial_hash.remove(g.entity_list[i])
                         del g.entity_list[i]
                 g.force_update = True
             # Key configuration
@@ -111,8 +112,9 @@ def event_check():
 
                     if type(g.map[x][y]) == tiles.LauncherTile:
                         g.map[x][y].shoot_direction = launcher_dir
+                        g.map[x][y].wake()
                         g.tile_target_selection = None
-                        del g.special_entity_list["tile_target"]
+                        entities.delete_special_entity("tile_target")
                         g.special_entity_list["player"].browsing_menu = False
 
                     elif g.get_img(x, y).factory_output:
@@ -123,7 +125,7 @@ def event_check():
 
                     else:
                         g.tile_target_selection = None
-                        del g.special_entity_list["tile_target"]
+                        entities.delete_special_entity("tile_target")
                         g.special_entity_list["player"].browsing_menu = False
                     g.force_update = True
 
@@ -146,7 +148,7 @@ def event_check():
                 elif g.tile_target_selection is not None:
                     g.special_entity_list["player"].browsing_menu = False
                     g.tile_target_selection = None
-                    del g.special_entity_list["tile_target"]
+                    entities.delete_special_entity("tile_target")
                     if "menu" in g.non_entity_list:
                         del g.non_entity_list["menu"]
                     g.force_update = True
@@ -187,7 +189,7 @@ def _move(event, direction):
                         g.tile_target_selection[1] += direction[1]
                     else:
                         g.tile_target_selection = None
-                        del g.special_entity_list["tile_target"]
+                        entities.delete_special_entity("tile_target")
                         g.special_entity_list["player"].browsing_menu = False
                         g.force_update = True
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/logistics.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the Dispatcher, which decides where the goods of every factory are sent.
+    Factories offer their goods when a robot is home to carry them, and the dispatcher matches the offers
+    to the factories requesting those goods once every tick, using the flow fields in pathing.py.
+"""
+from collections import OrderedDict
+
+from src import globals as g
+from src import metrics
+from src import pathing
+
+
+class Dispatcher(object):
+    """ Keeps a ledger of the goods factories are offering (supplies) and the goods they are requesting (demands).
+        Once every tick dispatch() matches them, nearest goods first, and tells the factories to send out robots.
+        Goods are only looked at again when something happened that could give them somewhere to go,
+        so goods that can't be delivered anywhere cost nothing while they wait.
+    """
+    def __init__(self):
+        # {"goods_name": OrderedDict {(x, y, robot_number): None}}, the robots waiting to carry goods_name
+        self.supplies = {}
+        # {"goods_name": {(x, y): amount}}, how many of goods_name the factories request
+        self.demands = {}
+        # {"goods_name": amount}, the sum of the demands for every type of goods
+        self.total_demands = {}
+        # The goods that got new offers or demands since they were last matched
+        self.changed = set()
+        # {"goods_name": revision}, the revision of the flow field of goods_name when it was last matched
+        self.field_revisions = {}
+        # Counter for how many robots have been sent out
+        self.matches = 0
+
+    def clear(self):
+        """ Forgets all supplies and demands. Should be called when a new map is loaded.
+        """
+        self.supplies.clear()
+        self.demands.clear()
+        self.total_demands.clear()
+        self.changed.clear()
+        self.field_revisions.clear()
+
+    def offer(self, x, y, number, goods_name):
+        """ Offers goods_name from the factory at x, y, to be carried by its robot with the number "number".
+            Offering the same robot again does nothing, so factories can offer every tick.
+        """
+        offers = self.supplies.setdefault(goods_name, OrderedDict())
+        if (x, y, number) not in offers:
+            offers[(x, y, number)] = None
+            self.changed.add(goods_name)
+
+    def set_demand(self, x, y, goods_name, amount):
+        """ Sets how many of goods_name the factory at x, y requests. Called by tiles.FactoryTile.set_request().
+        """
+        demands = self.demands.setdefault(goods_name, {})
+        old_amount = demands.get((x, y), 0)
+        if amount > 0:
+            demands[(x, y)] = amount
+        else:
+            demands.pop((x, y), None)
+            amount = 0
+        self.total_demands[goods_name] = self.total_demands.get(goods_name, 0) + amount - old_amount
+        if amount > old_amount:
+            self.changed.add(goods_name)
+
+    def target_changed(self, goods_name):
+        """ Makes the offers of goods_name get matched again, since a factory got a new target for them.
+        """
+        self.changed.add(goods_name)
+
+    def remove_tile(self, x, y):
+        """ Removes all offers and demands of the factory at x, y. Should be called when it is replaced.
+        """
+        for offers in self.supplies.values():
+            for key in [key for key in offers if key[:2] == (x, y)]:
+                del offers[key]
+        for goods_name in self.demands:
+            if (x, y) in self.demands[goods_name]:
+                self.set_demand(x, y, goods_name, 0)
+
+    def dispatch(self):
+        """ Matches offered goods to factories requesting them and sends out robots to carry them.
+            Should be called once every tick, after the tiles have ticked.
+        """
+        for goods_name, offers in self.supplies.items():
+            if not offers:
+                continue
+            # The flow field is invalidated when the map or the requests change, which might open up new ways
+            revision = pathing.flow_fields.revisions[goods_name]
+            if goods_name not in self.changed and self.field_revisions.get(goods_name) == revision:
+                continue
+            self.changed.discard(goods_name)
+            self.field_revisions[goods_name] = revision
+            self._send_to_targets(goods_name, offers)
+            if self.total_demands.get(goods_name, 0) > 0:
+                self._match(goods_name, offers)
+
+    def _send_to_targets(self, goods_name, offers):
+        """ Sends the goods of factories that have a target set by the player for goods_name to that target,
+            whether it requests the goods or not, if it can recieve them and can be reached.
+        """
+        for key in list(offers):
+            x, y, number = key
+            target = g.map[x][y].good_targets.get(goods_name)
+            if target is None:
+                continue
+            if not any(good[0] == goods_name for good in g.get_img(*target).factory_input):
+                continue
+            result = pathing.path_cache.find_path((x, y), target)
+            if result is not None:
+                self._send(key, goods_name, *result)
+            else:
+                metrics.production.count(x, y, goods_name, metrics.FAILED_SEARCHES)
+
+    def _match(self, goods_name, offers):
+        """ Sends the offered goods_name to the factories requesting them, the goods nearest to any of
+            those factories first. Every robot only has to walk downhill in the flow field of goods_name.
+        """
+        waiting = []
+        for key in offers:
+            distance = pathing.flow_fields.distance(key[:2], goods_name)
+            if distance is not None:
+                waiting.append((distance, key))
+        waiting.sort()
+
+        for distance, key in waiting:
+            if self.total_demands.get(goods_name, 0) <= 0:
+                break
+            # The field is recomputed here if the last robot took the last goods a factory requested
+            result = pathing.flow_fields.find_path(key[:2], goods_name)
+            if result is not None:
+                self._send(key, goods_name, *result)
+            else:
+                metrics.production.count(key[0], key[1], goods_name, metrics.FAILED_SEARCHES)
+
+    def _send(self, key, goods_name, path, deliver_tile):
+        """ Sends out the robot of the offer "key" along path and takes the goods from the request of deliver_tile.
+        """
+        x, y, number = key
+        del self.supplies[goods_name][key]
+        g.map[deliver_tile[0]][deliver_tile[1]].change_request(goods_name, -1)
+        g.map[x][y].dispatch_robot(number, goods_name, path, deliver_tile)
+        self.matches += 1
+
+
+# The dispatcher used by all factories
+dispatcher = Dispatcher()
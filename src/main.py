@@ -20,34 +20,36 @@ import time
 # Third party modules
 import pygame
 
-from src import key_input, tiles
-from src import players
-from src import maps
+from src import key_input
+from src import simulation
+from src import camera
+from src import rendering
+from src import graphics
 # globals and constants are renamed because they are used very very often.
 # This name change is constant through all modules that use them
 from src import globals as g
 from src import constants as c
 
     
-def main():
+def main(seed=None):
     """ Main function, initializes various variables and contains the main program loop.
         Should not be called any other way than running the file or running launch.
-        Takes no arguments and returns nothing.
+        "seed" is used to seed the map generation, if it isn't None.
+        Returns nothing.
     """
-    # initialize pygame
-    pygame.init()
+    # initialize pygame, make the map and the player
+    simulation.start_game(seed)
+    game = simulation.Simulation()
 
-    # Make map
-    maps.load_map(maps.generate_map())
-    # maps.load_map()
-
-    # Initiate player
-    g.special_entity_list["player"] = players.Player(g.player_start_x, g.player_start_y)
-    # Creates a window just the size to fit all the tiles in the map file.
+    # Creates a window just the size to fit all the tiles in the map file, or c.WINDOW_TILES if the map is larger.
     pygame.display.set_icon(g.images["icon"].get())
     pygame.display.set_caption("TileGame by ZeeQyu", "TileGame")
-    g.screen = pygame.display.set_mode((g.width * c.TILE_SIZE,
-                                        g.height * c.TILE_SIZE))
+    g.screen = pygame.display.set_mode(camera.window_size())
+    # Now that the display exists, the images can be converted to its format
+    graphics.convert_graphics(g.images)
+    # The camera shows the part of the map around the player
+    g.camera = camera.Camera(*g.screen.get_size())
+    renderer = rendering.Renderer()
     
     # A variable for skipping a single cycle after f.ex. accessing a menu, so that
     # the entities won't fly across the screen
@@ -99,90 +101,28 @@ def main():
 
             if time_last_tick + c.TICK_FREQ <= time_now:
                 time_last_tick = time_last_tick + c.TICK_FREQ
-                # Tick all the entities (let them do whatever they do every tick
-                for i in range(len(g.entity_list)-1, -1, -1):
-                    entity = g.entity_list[i]
-                    if entity.tick() == "delete":
-                        del g.entity_list[i]
-                        g.force_update = True
-                for entity in list(g.special_entity_list.values()):
-                    entity.tick()
-                for tile in g.tick_tiles:
-                    g.map[tile[0]][tile[1]].tick()
+                # Tick all the entities and tiles (let them do whatever they do every tick
+                game.tick()
             # Make sure the loop doesn't go too quickly and bog the processor down
             if time_last_sleep < c.SLEEP_TIME:
                 time.sleep(c.SLEEP_TIME - time_last_sleep)
 
-            # update all entities
-            entity_has_moved = False
-            if g.entity_list:
-                for i in range(len(g.entity_list)-1, -1, -1):
-                    entity = g.entity_list[i]
-                    entity.update(time_diff)
-                    # Check if any of them have moved
-                    if entity.has_moved():
-                        entity_has_moved = True
-            if g.special_entity_list:
-                for entity in list(g.special_entity_list.values()):
-                    # Update all entities and check for if any of them is a package that just finished moving.
-                    # If so, skip the has_moved check for that entity.
-                    if entity.update(time_diff) == "deleted":
-                        continue
-                    if entity.has_moved():
-                        entity_has_moved = True
-            if "tile_target" in g.special_entity_list:
-                while g.tile_target_selection[0] >= g.width:
-                    g.tile_target_selection[0] -= g.width
-                while g.tile_target_selection[0] < 0:
-                    g.tile_target_selection[0] += g.width
-
-                while g.tile_target_selection[1] >= g.height:
-                    g.tile_target_selection[1] -= g.height
-                while g.tile_target_selection[1] < 0:
-                    g.tile_target_selection[1] += g.height
-
-                g.special_entity_list["tile_target"].x = g.tile_target_selection[0] * c.TILE_SIZE
-                g.special_entity_list["tile_target"].y = g.tile_target_selection[1] * c.TILE_SIZE
-            if g.non_entity_list:
-                for item in list(g.non_entity_list.values()):
-                    try:
-                        if item.update(time_diff):
-                            entity_has_moved = True
-                    except AttributeError:
-                        pass
-
-            # Check if any tiles need to be updated.
-            if g.tile_maker_queue:
-                while g.tile_maker_queue:
-                    tiles.make_tile(*g.tile_maker_queue.pop())
+            # update all entities, tiles and the painted map
+            entity_has_moved = game.update(time_diff)
 
-            # Update map buffer if needed
-            if g.update_map:
-                g.update_map = False
-                g.force_update = True
-                g.map_screen_buffer = maps.update_map()
-                g.update_microtiles = False
+        # Scroll the view along with the player
+        if g.camera.follow(g.special_entity_list["player"]):
+            g.force_update = True
 
-        # If any entity moved, redraw the screen
-        if entity_has_moved or g.force_update:
+        # If anything changed, redraw the screen. If only entities moved, only redraw where they are and were.
+        # The metrics overlay can change without anything moving, so it's checked while it's shown
+        if g.force_update:
             g.force_update = False
             time_updates += 1
-            g.screen.fill(c.BACKGROUND_COLOR)
-            # Draw the map buffer on the screen
-            g.screen.blit(g.map_screen_buffer, (0, 0))
-            # Draw the objects
-            for i in range(len(g.entity_list)-1, -1, -1):
-                entity = g.entity_list[i]
-                entity.paint()
-            for i in range(len(list(g.special_entity_list.values()))-1, -1, -1):
-                entity = list(g.special_entity_list.values())[i]
-                entity.paint()
-            for i in range(len(list(g.non_entity_list.values()))-1, -1, -1):
-                list(g.non_entity_list.values())[i].paint()
-            del entity
-
-            # Update the display
-            pygame.display.flip()
+            renderer.paint()
+        elif entity_has_moved or renderer.overlay.is_shown():
+            time_updates += 1
+            renderer.paint_dirty()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/map_generation.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the cellular automata map generator working on NumPy arrays.
+    The map is an array of tile type ids (from tile_types) indexed [x, y], and every step of the
+    generation works on the whole array at once, counting neighbours by shifting the array.
+    maps.load_map() can load these arrays directly.
+
+    NumPy is optional. If it isn't installed, "numpy" is None and maps.py uses its slower
+    generator working on pygame Surfaces instead. Other modules check map_generation.numpy too,
+    so that they all agree on whether NumPy is used.
+"""
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src import constants as c
+from src.tile_types import TYPE_IDS
+
+GRASS = TYPE_IDS["grass"]
+TREE = TYPE_IDS["tree"]
+ORE = TYPE_IDS["ore"]
+ROCK = TYPE_IDS["rock"]
+WATER = TYPE_IDS["water"]
+
+
+def _new_random_state():
+    """ Makes a NumPy random generator seeded from the random module, so that random.seed() decides the map.
+    """
+    return numpy.random.RandomState(random.randint(0, 2 ** 32 - 1))
+
+
+def _shift(array, relative_x, relative_y, fill):
+    """ Returns a copy of the array where every element is the element of "array" at
+        [x + relative_x, y + relative_y], or "fill" if that is outside of the array.
+    """
+    width, height = array.shape
+    shifted = numpy.empty_like(array)
+    shifted.fill(fill)
+    shifted[max(-relative_x, 0):width - max(relative_x, 0), max(-relative_y, 0):height - max(relative_y, 0)] = \
+        array[max(relative_x, 0):width + min(relative_x, 0), max(relative_y, 0):height + min(relative_y, 0)]
+    return shifted
+
+
+def _count_neighbours(mask, outside, include_self):
+    """ Counts, for every tile, how many of the tiles in the 3x3 square around it are True in "mask".
+        "outside" is whether tiles outside of the map count.
+    """
+    counts = numpy.zeros(mask.shape, dtype=numpy.int16)
+    for relative_x in (-1, 0, 1):
+        for relative_y in (-1, 0, 1):
+            if relative_x == 0 and relative_y == 0 and not include_self:
+                continue
+            counts += _shift(mask, relative_x, relative_y, outside)
+    return counts
+
+
+def _neighbours(map_array, xs, ys, offsets):
+    """ Returns the x and y coordinates of the neighbours at "offsets" of the tiles at xs, ys, as two arrays
+        with one row per tile and one column per offset, and a mask of which of them are inside of the map.
+        Neighbours outside of the map get the coordinates 0, 0 so they can still be used as indices.
+    """
+    width, height = map_array.shape
+    neighbour_xs = xs[:, None] + offsets[:, 0]
+    neighbour_ys = ys[:, None] + offsets[:, 1]
+    inside = (neighbour_xs >= 0) & (neighbour_xs < width) & (neighbour_ys >= 0) & (neighbour_ys < height)
+    neighbour_xs[~inside] = 0
+    neighbour_ys[~inside] = 0
+    return neighbour_xs, neighbour_ys, inside
+
+
+def _spread(map_array, xs, ys, tile_id, random_state):
+    """ Makes every tile at the coordinates in xs and ys turn a random one of its orthogonal non-water neighbours
+        into tile_id. The coordinates should be in the order the old generator went through the map,
+        column by column (which is the order numpy.nonzero() gives).
+
+        returns the coordinates of the tiles that became tile_id to the right of or below their source.
+            The old generator changed the map as it went through it, so those tiles got their own turn
+            in the same iteration. The iterations below do that by spreading from them again until
+            there are none left.
+    """
+    height = map_array.shape[1]
+    directions = numpy.array(c.RELATIVE_DIRECTIONS)
+    later_tiles = []
+    while len(xs):
+        # Give every allowed direction of every tile a random number, and pick the one with the highest
+        neighbour_xs, neighbour_ys, allowed = _neighbours(map_array, xs, ys, directions)
+        allowed &= map_array[neighbour_xs, neighbour_ys] != WATER
+        weights = random_state.random_sample(allowed.shape) * allowed
+        chosen = weights.argmax(axis=1)
+        # Tiles without any allowed direction don't spread
+        spreading = weights[numpy.arange(len(xs)), chosen] > 0
+        xs, ys, chosen = xs[spreading], ys[spreading], chosen[spreading]
+        target_xs = xs + directions[chosen, 0]
+        target_ys = ys + directions[chosen, 1]
+
+        # If several tiles picked the same tile, the first one gets it
+        first = numpy.unique(target_xs * height + target_ys, return_index=True)[1]
+        won = numpy.zeros(len(xs), dtype=bool)
+        won[first] = True
+        later = won & (directions[chosen].max(axis=1) > 0) & (map_array[target_xs, target_ys] != tile_id)
+        later_tiles.append(target_xs[later] * height + target_ys[later])
+        map_array[target_xs[won], target_ys[won]] = tile_id
+
+        if tile_id != WATER:
+            # The tile can still be picked, so it doesn't matter that someone else got there first
+            break
+        # The others pick again, like they would have done in the old generator where they came after
+        xs, ys = xs[~won], ys[~won]
+
+    later_tiles = numpy.unique(numpy.concatenate(later_tiles)) if later_tiles else numpy.array([], dtype=int)
+    return later_tiles // height, later_tiles % height
+
+
+def random_map(width, height, random_state):
+    """ Returns a map array with randomly spread trees, ores, rocks and water on grass.
+    """
+    random_numbers = random_state.randint(1, 1001, size=(width, height))
+    return numpy.select([random_numbers <= c.GEN_TREE_PER_MILLE,
+                         random_numbers >= 1000 - c.GEN_ORE_PER_MILLE,
+                         random_numbers >= 1000 - c.GEN_ORE_PER_MILLE - c.GEN_ROCK_PER_MILLE,
+                         random_numbers >= 1000 - c.GEN_ORE_PER_MILLE - c.GEN_ROCK_PER_MILLE - c.GEN_WATER_PER_MILLE],
+                        [TREE, ORE, ROCK, WATER], GRASS).astype(numpy.uint16)
+
+
+def iterate_water(map_array, random_state):
+    """ Evolves water pools formations every iteration
+    """
+    xs, ys = numpy.nonzero(map_array == WATER)
+    while len(xs):
+        expanding = random_state.randint(1, 101, size=len(xs)) <= c.GEN_WATER_EXPAND_CHANCE
+        xs, ys = _spread(map_array, xs[expanding], ys[expanding], WATER, random_state)
+    return map_array
+
+
+def smooth_water(map_array):
+    """ Makes every tile that only has water around it into water (removes islands of one block)
+    """
+    non_water = map_array != WATER
+    non_water_neighbours = numpy.zeros(map_array.shape, dtype=numpy.int8)
+    for relative_x, relative_y in c.RELATIVE_DIRECTIONS:
+        non_water_neighbours += _shift(non_water, relative_x, relative_y, False)
+    map_array[non_water_neighbours == 0] = WATER
+    return map_array
+
+
+def iterate_trees(map_array, random_state):
+    """ Function for iteratively making the generated area more smooth and evolving ore formations
+    """
+    # Tiles outside of the map count as blocked
+    blocked = _count_neighbours((map_array == TREE) | (map_array == ROCK), True, True)
+    ores = _count_neighbours(map_array == ORE, False, False)
+
+    iterated_array = numpy.full(map_array.shape, GRASS, dtype=numpy.uint16)
+    # Crowded tiles become trees, unless they are ore or rock already
+    crowded = blocked >= 5
+    iterated_array[crowded] = TREE
+    iterated_array[crowded & (map_array == ORE)] = ORE
+    iterated_array[crowded & (map_array == ROCK)] = ROCK
+    # Tiles next to exactly one ore might become ore
+    iterated_array[(ores == 1) & (random_state.randint(1, 101, size=map_array.shape) < c.GEN_ORE_CHANCE)] = ORE
+    # Water stays the same
+    iterated_array[map_array == WATER] = WATER
+    return iterated_array
+
+
+def iterate_rocks(map_array, random_state):
+    """ Evolves rock formations every iteration
+    """
+    offsets = numpy.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1) if (i, j) != (0, 0)])
+    xs, ys = numpy.nonzero(map_array == ROCK)
+    while len(xs):
+        # Rocks with two or less rocks around them spread
+        neighbour_xs, neighbour_ys, inside = _neighbours(map_array, xs, ys, offsets)
+        rocks = (inside & (map_array[neighbour_xs, neighbour_ys] == ROCK)).sum(axis=1)
+        lonely = rocks <= 2
+        xs, ys = _spread(map_array, xs[lonely], ys[lonely], ROCK, random_state)
+    return map_array
+
+
+def generate_map(width, height):
+    """ Generates a map with cellular automata and returns it as an array of tile type ids.
+    """
+    random_state = _new_random_state()
+    map_array = random_map(width, height, random_state)
+
+    for i in range(c.GEN_WATER_ITERATIONS):
+        map_array = iterate_water(map_array, random_state)  # Expanding water
+
+    map_array = smooth_water(map_array)  # Smooth water (remove islands of one block)
+
+    for i in range(c.GEN_TREE_ITERATIONS):
+        map_array = iterate_trees(map_array, random_state)  # Smoothing trees
+
+    for i in range(c.GEN_ROCK_ITERATIONS):
+        map_array = iterate_rocks(map_array, random_state)
+
+    # Put out packages in the middle, with the player starting on one of them
+    x = width // 2
+    y = height // 2
+    map_array[x-1:x+1, y-1:y+1] = TYPE_IDS["package"]
+    map_array[x, y] = TYPE_IDS["start_tile"]
+
+    return map_array
+
+
+def _stage(map_array):
+    """ Returns a copy of the map with an endless package and the player in the middle,
+        for showing a stage of the generation.
+    """
+    stage = map_array.copy()
+    width, height = stage.shape
+    stage[width // 2, height // 2] = TYPE_IDS["endless_package"]
+    stage[width // 2 + 1, height // 2] = TYPE_IDS["start_tile"]
+    return stage
+
+
+def generate_map_stages(width, height):
+    """ A generator version of generate_map() that yields every stage of the generation.
+    """
+    random_state = _new_random_state()
+    map_array = random_map(width, height, random_state)
+    yield _stage(map_array)
+
+    for i in range(c.GEN_WATER_ITERATIONS):  # Expand water
+        map_array = iterate_water(map_array, random_state)
+        yield _stage(map_array)
+
+    map_array = smooth_water(map_array)  # Smooth water
+    yield _stage(map_array)
+
+    for i in range(c.GEN_TREE_ITERATIONS):  # Smooth trees and expand ores
+        map_array = iterate_trees(map_array, random_state)
+        yield _stage(map_array)
+
+    for i in range(c.GEN_ROCK_ITERATIONS):  # Expand rocks
+        map_array = iterate_rocks(map_array, random_state)
+        yield _stage(map_array)
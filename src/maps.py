@@ -10,116 +10,376 @@
     The map is the multidimensional array of tiles 
     which is used for painting the game world on the screen.
     It can be edited easily by replacing an index with a new tile instance.
+    The map is painted in chunks, which are kept by the chunk_cache.
 """
 import os
-import sys
 import random
+from collections import OrderedDict
 
 import pygame
 
 from src import tiles
+from src import pathing
+from src import logistics
+from src import metrics
+from src import networks
+from src import grid
+from src import scheduler
+from src import tile_types
+from src import map_generation
 import src.constants as c
 import src.globals as g
 
 
 def load_map(map_image=None):
     """ Function that loads a PIL image and reads it, pixel by pixel, to decode it into a tile map. 
+        "map_image" can also be an array of tile type ids indexed [x, y], like the ones map_generation makes.
+        If NumPy is installed, images are turned into such an array by decode_map_image() first,
+        and the map is filled with all plain tiles at once.
         
-        Gets the map from the c.IMAGES["map"] object.
-        Sets a map (two-dimensional list of Tiles), the width and height of the image loaded 
+        Gets the map from the c.IMAGES["map"] object if map_image is None.
+        Sets a map (a grid.Grid of Tiles), the width and height of the image loaded 
         and the player starting point, x and y, from the file as variables in the g module.
         (5 items) If no starting point is found, return 0, 0 as the starting point. 
     """
     if map_image is None:
         # Load the image
         map_image = pygame.image.load(os.path.join(os.getcwd(), c.RES_FOLDER, c.IMAGES["map"].png))
+    if isinstance(map_image, pygame.Surface) and map_generation.numpy is not None:
+        map_image = decode_map_image(map_image)
 
-    g.map = []
+    if isinstance(map_image, pygame.Surface):
+        width, height = map_image.get_size()
+    else:
+        width, height = map_image.shape
+    g.map = grid.Grid(width, height)
+    # Paths found on the old map are useless on the new one
+    pathing.path_cache.clear()
+    pathing.walkable_regions.clear()
+    logistics.dispatcher.clear()
+    metrics.production.clear()
+    networks.settled_networks.clear()
+    scheduler.timer_wheel.clear()
+    # Sets the values to the global values
+    g.width = width
+    g.height = height
+
+    if isinstance(map_image, pygame.Surface):
+        multi_tiles = _load_map_image(map_image)
+    else:
+        multi_tiles = _load_map_array(map_image)
+
+    # Create the multi-tiles
+    for multi_tile in multi_tiles:
+        px_type, x, y = multi_tile
+        width, height = tile_types.TYPES_BY_NAME[px_type].multi_tile
+        if (g.map[x][y] and g.map[x][y].type == c.DEFAULT_TILE and 
+                tiles.area_is_free(x, y, width, height)):
+            tiles.make_tile(px_type, x, y)
+
+    # Now that all tiles are there, find the shapes of the microtiles
+    tiles.update_microtiles()
+
+
+def _load_map_image(map_image):
+    """ Makes the tiles of the map from a map image, one pixel at a time.
+        Sets the player starting point in the g module.
+
+        returns a list of [type, x, y] for the multi-tiles, which should be made last
+    """
     # Variable for holding multi_tiles until after the primary generation.
     multi_tiles = []
-    width, height = map_image.get_size()
-    player_start_x = 0
-    player_start_y = 0
-    
-    for x in range(width):
-        # Create a new vertical column for every pixel the image is wide.
-        g.map.append([])
-        for y in range(height):
+    g.player_start_x = 0
+    g.player_start_y = 0
+    for x in range(g.width):
+        for y in range(g.height):
             # The pixel variable is the pixel we're currently checking.
             pixel = map_image.get_at((x, y))[:3]
             px_type = pixel_type(pixel, x, y)
             # If the pixel is the player start tile, save the location of that pixel.
             if px_type == "start_tile":
-                player_start_x = x * c.TILE_SIZE
-                player_start_y = y * c.TILE_SIZE
+                g.player_start_x = x * c.TILE_SIZE
+                g.player_start_y = y * c.TILE_SIZE
                 px_type = c.DEFAULT_TILE
             # Check to see if it's a multi-tile and, if so, store that in a variable to be done last
-            g.map[x].append(None)
-            if c.IMAGES[px_type].multi_tile:
+            if tile_types.TYPES_BY_NAME[px_type].multi_tile:
                 multi_tiles.append([px_type, x, y])
                 tiles.make_tile(c.DEFAULT_TILE, x, y)
             else:
                 # Make a new tile and add it to the map
                 tiles.make_tile(px_type, x, y)
-            
-    # Sets the values to the global values
-    g.width = width
-    g.height = height
-    g.player_start_x = player_start_x
-    g.player_start_y = player_start_y
-    
-    # Create the multi-tiles
-    for multi_tile in multi_tiles:
-        px_type, x, y = multi_tile
-        width, height = c.IMAGES[px_type].multi_tile
-        if (g.map[x][y] and g.map[x][y].type == c.DEFAULT_TILE and 
-                tiles.area_is_free(x, y, width, height)):
-            tiles.make_tile(px_type, x, y)
-    
+    return multi_tiles
+
+
+def _load_map_array(map_array):
+    """ Makes the tiles of the map from an array of tile type ids. All plain tiles are put in the map at once
+        with grid.Grid.fill(), and only the tiles that need their own object are made with tiles.make_tile().
+        Sets the player starting point in the g module.
+
+        returns a list of [type, x, y] for the multi-tiles, which should be made last
+    """
+    multi_tiles = []
+    # The tiles to make one at a time, as (type, index) pairs
+    object_tiles = []
+    g.player_start_x = 0
+    g.player_start_y = 0
+    start_id = tile_types.TYPE_IDS["start_tile"]
+    default_id = tile_types.TYPE_IDS[c.DEFAULT_TILE]
+    # The array is indexed [x, y], so flattening it gives the tiles in the order the grid keeps them
+    type_ids = map_array.ravel().tolist()
+    for index, type_id in enumerate(type_ids):
+        tile_type = tile_types.TYPES[type_id]
+        if tile_type.plain and type_id != start_id:
+            continue
+        if type_id == start_id:
+            x, y = divmod(index, g.height)
+            g.player_start_x = x * c.TILE_SIZE
+            g.player_start_y = y * c.TILE_SIZE
+            type_ids[index] = default_id
+        elif tile_type.multi_tile:
+            multi_tiles.append([tile_type.name, index // g.height, index % g.height])
+            type_ids[index] = default_id
+        else:
+            # Left empty in the grid until make_tile() makes it
+            object_tiles.append((tile_type.name, index))
+            type_ids[index] = 0
+
+    g.map.fill(type_ids)
+    for px_type, index in object_tiles:
+        tiles.make_tile(px_type, index // g.height, index % g.height)
+    # make_tile() does these for every tile it makes, but fill() doesn't
+    pathing.flow_fields.invalidate()
+    g.update_map = True
+    return multi_tiles
+
+
+def _packed_colors(color_codes):
+    """ Packs RGB colors into single integers, red * 65536 + green * 256 + blue.
+        "color_codes" should be a NumPy array with the red, green and blue values along the last axis.
+    """
+    color_codes = color_codes.astype(map_generation.numpy.uint32)
+    return (color_codes[..., 0] << 16) | (color_codes[..., 1] << 8) | color_codes[..., 2]
+
+
+def decode_map_image(map_image):
+    """ Decodes a map image into an array of tile type ids indexed [x, y], which load_map() can load.
+        Looks up the tile types of all pixels at once in a table of the color codes. Needs NumPy.
+
+        "map_image" should be a pygame.Surface with the map colors, like map.png.
+    """
+    numpy = map_generation.numpy
+    # The packed color codes, sorted, and the tile type id of each of them
+    colors = sorted(tile_types.TYPES_BY_COLOR.items())
+    color_table = _packed_colors(numpy.array([color for color, px_type in colors]))
+    type_id_table = numpy.array([tile_types.TYPE_IDS[px_type] for color, px_type in colors], dtype=numpy.uint16)
+
+    rgb = pygame.surfarray.array3d(map_image)
+    pixels = _packed_colors(rgb)
+    # Find where every pixel would be in the sorted table, and check if it really is there
+    positions = numpy.minimum(numpy.searchsorted(color_table, pixels), len(color_table) - 1)
+    found = color_table[positions] == pixels
+    type_ids = numpy.where(found, type_id_table[positions], tile_types.TYPE_IDS[c.DEFAULT_TILE])
+    for x, y in zip(*numpy.nonzero(~found)):
+        # Print a message for every invalid color, like pixel_type() does
+        pixel_type(tuple(rgb[x, y]), x, y)
+    return type_ids.astype(numpy.uint16)
+
+
+def encode_map_image():
+    """ Paints the current map as a map image, with the color code of every tile on its pixel, so that it
+        can be loaded again with load_map(). The player starting point gets the start_tile color.
+        Tiles with types that have no color code (like dirt and factories) are painted as c.DEFAULT_TILE,
+        and so are the other tiles of multi-tiles, since load_map() makes those from the top left tile.
+
+        returns that pygame.Surface object
+    """
+    default_color = c.IMAGES[c.DEFAULT_TILE].color_code
+    # The color of every tile type id
+    color_table = [default_color] + [tile_type.color_code if tile_type.color_code is not None else default_color
+                                     for tile_type in tile_types.TYPES[1:]]
+    map_image = pygame.Surface((g.map.width, g.map.height))
+    if map_generation.numpy is not None:
+        numpy = map_generation.numpy
+        type_ids = numpy.frombuffer(g.map.types, dtype=numpy.uint16).reshape(g.map.width, g.map.height)
+        pygame.surfarray.blit_array(map_image, numpy.array(color_table, dtype=numpy.uint8)[type_ids])
+    else:
+        for x in range(g.map.width):
+            for y in range(g.map.height):
+                map_image.set_at((x, y), color_table[g.map.types[x * g.map.height + y]])
+    map_image.set_at((int(g.player_start_x) // c.TILE_SIZE, int(g.player_start_y) // c.TILE_SIZE),
+                     c.IMAGES["start_tile"].color_code)
+    return map_image
+
+
+def save_map(path):
+    """ Saves the current map as a map image file at "path" (for example "map.png") that load_map() can load.
+    """
+    pygame.image.save(encode_map_image(), path)
+
 
 def pixel_type(pixel, x, y):
     """ Function for checking a pixel color code and from that figuring out which kind of tile should go to that index in the map.
-        Finds the color codes in the the c.py IMAGES dictionary. If the color code is just 0, don't check that image.
+        Finds the color codes in the tile type registry, which has them from the c.py IMAGES dictionary.
         
         "pixel" should be a value in a pixel access object from PIL, which is a RGB value in a tuple.
         "x" and "y" are coordinates of the pixel in the pixel access object, for debugging purposes.
     """
-    for key in c.IMAGES:
-        # if the RGB value actually exists (and as such it is a tile)
-        if c.IMAGES[key].color_code != None:
-            # if the RGB value was found, return the key of that entry.
-            if pixel == c.IMAGES[key].color_code:
-                return key
+    # if the RGB value was found, return the key of that entry.
+    if tuple(pixel) in tile_types.TYPES_BY_COLOR:
+        return tile_types.TYPES_BY_COLOR[tuple(pixel)]
     # If no match was found, make the spot the standard tile and print a message containing the RGB 
     print("The pixel at x:", x, "y:", y, "in the map file is not a valid color. The RGB is", str(pixel))
     return c.DEFAULT_TILE
     
 
-def update_map():
-    """ Iterates through the map and paints all the tiles in that map in a surface object
+def update_map(chunk_x, chunk_y, chunk_surface=None):
+    """ Paints all the tiles in the chunk at chunk_x, chunk_y (counted in chunks of c.CHUNK_SIZE tiles)
+        on a surface object the size of that chunk.
+        Multi-tile heads in the chunks above and to the left are painted too, since their images can reach
+        into this chunk. Should normally only be called by the ChunkCache, which keeps the chunks that are shown.
+
+        "chunk_surface" is a surface with the right size to paint the chunk on. A new one is made if it is None.
         returns that pygame.Surface object
     """
+    first_x = chunk_x * c.CHUNK_SIZE
+    first_y = chunk_y * c.CHUNK_SIZE
+    last_x = min(first_x + c.CHUNK_SIZE, g.map.width)
+    last_y = min(first_y + c.CHUNK_SIZE, g.map.height)
+    if chunk_surface is None:
+        chunk_surface = pygame.Surface(((last_x - first_x)*c.TILE_SIZE, (last_y - first_y)*c.TILE_SIZE))
+
+    chunk_surface.fill(c.BACKGROUND_COLOR)
+    # Go through the tiles in the same order as the map was painted in before it was split up in chunks,
+    # so that overlapping images are painted in the same order
+    for i in range(max(first_x - MULTI_TILE_MARGIN, 0), last_x):
+        for j in range(max(first_y - MULTI_TILE_MARGIN, 0), last_y):
+            if i < first_x or j < first_y:
+                # Outside of the chunk, only multi-tile heads reach into it
+                if type(g.map.tiles.get((i, j))) != tiles.MultiTileHead:
+                    continue
+            image = g.images[g.map.image_at(i, j)].get()
+            chunk_surface.blit(image, ((i - first_x)*c.TILE_SIZE, (j - first_y)*c.TILE_SIZE))
+
+    return chunk_surface
+
+
+def update_dirty_tiles():
+    """ Makes the chunks with the tiles in g.dirty_tiles get repainted the next time they are shown,
+            instead of repainting the whole map.
+    """
+    for x, y in g.dirty_tiles:
+        chunk_cache.tile_changed(x, y)
+    g.dirty_tiles.clear()
 
-    map_screen_buffer = pygame.Surface((len(g.map)*c.TILE_SIZE, len(g.map[1])*c.TILE_SIZE))
-    
-    map_screen_buffer.fill(c.BACKGROUND_COLOR)
-    for i in range(len(g.map)):
-        for j in range(len(g.map[i])):
-            try:
-                image = g.images[g.map[i][j].get_image()].get()
-            except:
-                import pdb, sys
-                e, m, tb = sys.exc_info()
-                print(e, m, tb)
-                pdb.post_mortem(tb)
-            map_screen_buffer.blit(image, (i*c.TILE_SIZE, j*c.TILE_SIZE))
-    #g.update_microtiles = False
-            
-    return map_screen_buffer
+
+class ChunkCache(object):
+    """ Keeps painted chunks of the map, c.CHUNK_SIZE by c.CHUNK_SIZE tiles each, so that the map doesn't have to be
+        one surface the size of the whole map. Chunks are painted when they are first shown, painted again
+        when a tile in them has changed and thrown away, least recently used first, when the chunks take up more
+        than c.CHUNK_CACHE_MEMORY bytes.
+    """
+    def __init__(self):
+        # {(chunk_x, chunk_y): pygame.Surface}, ordered from least to most recently used
+        self.chunks = OrderedDict()
+        # The chunks that have changed since they were painted
+        self.dirty_chunks = set()
+        # The amount of bytes the surfaces of all chunks take up
+        self.memory = 0
+        # The amount of times a chunk was used while already painted, had to be painted (again because it
+        # had changed) and was thrown away because the cache was full
+        self.hits = 0
+        self.misses = 0
+        self.repaints = 0
+        self.evictions = 0
+
+    def clear(self):
+        """ Forgets all chunks. Should be called when a new map is loaded.
+        """
+        self.chunks.clear()
+        self.dirty_chunks.clear()
+        self.memory = 0
+
+    def tile_changed(self, x, y):
+        """ Marks the chunks the tile at x, y can be painted in as changed.
+            Multi-tile images can reach MULTI_TILE_MARGIN tiles to the right and down.
+        """
+        for chunk_x in range(x // c.CHUNK_SIZE, (x + MULTI_TILE_MARGIN) // c.CHUNK_SIZE + 1):
+            for chunk_y in range(y // c.CHUNK_SIZE, (y + MULTI_TILE_MARGIN) // c.CHUNK_SIZE + 1):
+                if (chunk_x, chunk_y) in self.chunks:
+                    self.dirty_chunks.add((chunk_x, chunk_y))
+
+    def get(self, chunk_x, chunk_y):
+        """ Returns the painted surface of the chunk, painting it first if it isn't painted or has changed.
+        """
+        key = (chunk_x, chunk_y)
+        if key in self.chunks:
+            chunk_surface = self.chunks.pop(key)
+            if key in self.dirty_chunks:
+                self.dirty_chunks.discard(key)
+                self.repaints += 1
+                update_map(chunk_x, chunk_y, chunk_surface)
+            else:
+                self.hits += 1
+        else:
+            self.misses += 1
+            chunk_surface = update_map(chunk_x, chunk_y)
+            self.memory += chunk_surface.get_width() * chunk_surface.get_height() * chunk_surface.get_bytesize()
+        # Put it last, as the most recently used
+        self.chunks[key] = chunk_surface
+        return chunk_surface
+
+    def evict(self, keep=()):
+        """ Throws away the least recently used chunks until the chunks fit in c.CHUNK_CACHE_MEMORY,
+            except for the chunks in "keep".
+        """
+        while self.memory > c.CHUNK_CACHE_MEMORY and self.chunks:
+            key = next(iter(self.chunks))
+            if key in keep:
+                # All chunks left are ones that should be kept
+                break
+            chunk_surface = self.chunks.pop(key)
+            self.dirty_chunks.discard(key)
+            self.memory -= chunk_surface.get_width() * chunk_surface.get_height() * chunk_surface.get_bytesize()
+            self.evictions += 1
+
+    def paint(self, camera):
+        """ Paints the part of the map that the camera sees on g.screen.
+        """
+        first_x, first_y, last_x, last_y = camera.visible_tiles()
+        visible_chunks = set()
+        for chunk_x in range(first_x // c.CHUNK_SIZE, (last_x - 1) // c.CHUNK_SIZE + 1):
+            for chunk_y in range(first_y // c.CHUNK_SIZE, (last_y - 1) // c.CHUNK_SIZE + 1):
+                visible_chunks.add((chunk_x, chunk_y))
+                g.screen.blit(self.get(chunk_x, chunk_y),
+                              camera.to_screen(chunk_x * c.CHUNK_SIZE * c.TILE_SIZE,
+                                               chunk_y * c.CHUNK_SIZE * c.TILE_SIZE))
+        # The chunks on the screen were used last, so they will be the last ones to be thrown away
+        self.evict(visible_chunks)
+
+    def __len__(self):
+        """ Returns the amount of chunks that are painted
+        """
+        return len(self.chunks)
+
+
+# The amount of tiles the image of a multi-tile head can reach outside of its own tile, to the right and down
+MULTI_TILE_MARGIN = max(max(tile_type.multi_tile) - 1 for tile_type in tile_types.TYPES[1:] if tile_type.multi_tile)
+# The chunks of the map that have been painted
+chunk_cache = ChunkCache()
 
 
 def generate_map():
-    """ Map generation function using cellular automata
+    """ Map generation function using cellular automata.
+        Returns an array of tile type ids from map_generation if NumPy is installed,
+        and a map image made by _generate_map_image() otherwise.
+    """
+    if map_generation.numpy is not None:
+        return map_generation.generate_map(*c.GEN_MAP_SIZE)
+    return _generate_map_image()
+
+
+def _generate_map_image():
+    """ Map generation function using cellular automata, painting the map on a pygame Surface pixel by pixel
     """
     return_image = pygame.Surface(c.GEN_MAP_SIZE)
     return_image.fill(c.IMAGES["grass"].color_code)
@@ -172,6 +432,14 @@ def generate_map_generator():
     """ A generator version for the cellular automata function above that lets the player
         step through the stages of generation of the maps.
     """
+    if map_generation.numpy is not None:
+        return map_generation.generate_map_stages(*c.GEN_MAP_SIZE)
+    return _generate_map_image_generator()
+
+
+def _generate_map_image_generator():
+    """ The generator version of _generate_map_image()
+    """
     return_image = pygame.Surface(c.GEN_MAP_SIZE)
     return_image.fill(c.IMAGES["grass"].color_code)
     for i in range(return_image.get_width()):
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/metrics.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the production metrics, which count what every factory does with every type of goods,
+    so that factory layouts can be compared by numbers instead of by watching the robots.
+    Counting is a few list lookups, so it is always on.
+"""
+from collections import deque
+
+from src import scheduler
+from src import constants as c
+
+# The things that are counted, as indices in the lists of counts
+# Goods made by a factory
+PRODUCED = 0
+# Goods a factory sent out that arrived at another factory
+DELIVERED = 1
+# Goods that arrived at a factory
+RECIEVED = 2
+# Robots a factory sent out
+ROBOTS = 3
+# Searches for a path for the goods of a factory that found nothing
+FAILED_SEARCHES = 4
+# The sum of the ticks it took for delivered goods to arrive after their robot was sent out
+LATENCY = 5
+COUNTER_NAMES = ("produced", "delivered", "recieved", "robots", "failed_searches", "latency")
+
+
+class Stats(object):
+    """ Counts for one type of goods, at one factory or at all of them. Besides the totals, the counts are kept
+        in buckets of bucket_ticks ticks each, so that the counts of the last few buckets can be summed up.
+    """
+    def __init__(self, bucket_ticks, buckets):
+        self.bucket_ticks = bucket_ticks
+        self.totals = [0] * len(COUNTER_NAMES)
+        # (bucket number, [counts]) for the buckets that anything was counted in, newest last
+        self.buckets = deque(maxlen=buckets)
+
+    def count(self, tick, counter, amount=1):
+        """ Adds amount to counter on tick.
+        """
+        number = tick // self.bucket_ticks
+        if not self.buckets or self.buckets[-1][0] != number:
+            self.buckets.append((number, [0] * len(COUNTER_NAMES)))
+        self.buckets[-1][1][counter] += amount
+        self.totals[counter] += amount
+
+    def window(self, tick, ticks):
+        """ Returns the counts of the last "ticks" ticks before tick, rounded up to whole buckets.
+        """
+        first = (tick - ticks) // self.bucket_ticks + 1
+        counts = [0] * len(COUNTER_NAMES)
+        for number, bucket_counts in reversed(self.buckets):
+            if number < first:
+                break
+            for counter, amount in enumerate(bucket_counts):
+                counts[counter] += amount
+        return counts
+
+
+def as_dict(counts):
+    """ Turns a list of counts into a dictionary with the counter names as keys.
+        "latency" is the average amount of ticks a delivery took, or None if nothing was delivered.
+    """
+    result = dict(zip(COUNTER_NAMES, counts))
+    result["latency"] = float(counts[LATENCY]) / counts[DELIVERED] if counts[DELIVERED] else None
+    return result
+
+
+class ProductionMetrics(object):
+    """ Keeps Stats for every type of goods at every factory, and for every type of goods over all factories.
+        Factories are looked up by their tile coordinates.
+    """
+    def __init__(self, bucket_ticks=c.METRICS_BUCKET_TICKS, window_ticks=c.METRICS_WINDOW_TICKS):
+        self.bucket_ticks = bucket_ticks
+        # The default amount of ticks windows are counted over
+        self.window_ticks = window_ticks
+        # Enough buckets for the default window, including the bucket it starts in the middle of
+        self.buckets = window_ticks // bucket_ticks + 1
+        # {(x, y): {"goods_name": Stats}}
+        self.factories = {}
+        # {"goods_name": Stats}
+        self.goods = {}
+
+    def clear(self):
+        """ Forgets all counts. Should be called when a new map is loaded.
+        """
+        self.factories.clear()
+        self.goods.clear()
+
+    def count(self, x, y, goods_name, counter, amount=1):
+        """ Adds amount to counter (like metrics.PRODUCED) for goods_name at the factory at x, y.
+        """
+        tick = scheduler.timer_wheel.current_tick
+        factory = self.factories.setdefault((x, y), {})
+        if goods_name not in factory:
+            factory[goods_name] = Stats(self.bucket_ticks, self.buckets)
+        factory[goods_name].count(tick, counter, amount)
+        if goods_name not in self.goods:
+            self.goods[goods_name] = Stats(self.bucket_ticks, self.buckets)
+        self.goods[goods_name].count(tick, counter, amount)
+
+    def delivered(self, x, y, goods_name, latency):
+        """ Counts goods sent from the factory at x, y that arrived "latency" ticks after they were sent.
+        """
+        self.count(x, y, goods_name, DELIVERED)
+        self.count(x, y, goods_name, LATENCY, latency)
+
+    def remove_tile(self, x, y):
+        """ Forgets the counts of the factory at x, y. Should be called when it is replaced.
+            The counts of all factories are kept.
+        """
+        self.factories.pop((x, y), None)
+
+    def factory_window(self, x, y, ticks=None):
+        """ Returns {"goods_name": {"counter name": amount}} with the counts of the factory at x, y during the last
+            "ticks" ticks (self.window_ticks if it's None), or all ticks since it was made if ticks is 0.
+            Only the buckets of the last self.window_ticks ticks are kept, so longer windows count no more than that.
+        """
+        return self._window(self.factories.get((x, y), {}), ticks)
+
+    def goods_window(self, ticks=None):
+        """ Like factory_window(), but for all factories together.
+        """
+        return self._window(self.goods, ticks)
+
+    def _window(self, stats, ticks):
+        """ Returns the windows of all Stats in stats, which is {"goods_name": Stats}.
+        """
+        if ticks is None:
+            ticks = self.window_ticks
+        tick = scheduler.timer_wheel.current_tick
+        result = {}
+        for goods_name, goods_stats in stats.items():
+            if ticks:
+                result[goods_name] = as_dict(goods_stats.window(tick, ticks))
+            else:
+                result[goods_name] = as_dict(goods_stats.totals)
+        return result
+
+
+# The metrics counted by all factories
+production = ProductionMetrics()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/networks.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the settled networks, which let factory networks that have been left running
+    work without robot entities. Every robot of every factory has a Route, which remembers where the dispatcher
+    last sent it and how many ticks the trip took. Once a robot has been sent the same way to the same factory
+    c.NETWORK_SETTLE_CYCLES times in a row, its route is settled, and while the player is far away
+    its trips are only two events: the goods arriving and the robot coming home, on the ticks they did last time.
+
+    When the player comes near, or the map changes along the route, the trips that are under way are turned
+    back into robots where they would have been, and the route has to settle again.
+"""
+from src import globals as g
+from src import constants as c
+from src import metrics
+from src import pathing
+from src import scheduler
+
+
+class Route(object):
+    """ The way the robot with the number "number" of the factory at x, y was last sent, and how long it took.
+    """
+    def __init__(self, x, y, number, goods_name, path, deliver_tile):
+        self.x, self.y, self.number = x, y, number
+        self.goods_name = goods_name
+        # The path (not including the factory tile) as a tuple, and the tile of the factory the goods go to
+        self.path = tuple(path)
+        self.deliver_tile = deliver_tile
+        # The way back, found once the route has settled, and the tile the robot goes home to
+        self.home_path = None
+        self.home_tile = None
+        # The area (first x, first y, last x, last y) the paths go through, including the tiles next to them
+        self.area = None
+        # The amount of trips in a row that went this way and were measured
+        self.cycles = 0
+        # The ticks after being sent out that the goods arrived and that the robot came home on the last trip
+        self.deliver_ticks = None
+        self.return_ticks = None
+        # The tick the robot that is being measured was sent on, and if it has delivered its goods
+        self.sent_tick = None
+        self.delivered = False
+
+    def same_way(self, goods_name, path, deliver_tile):
+        """ Returns True if goods_name sent along path to deliver_tile is what this route did last time.
+        """
+        return (self.goods_name == goods_name and self.deliver_tile == deliver_tile and
+                self.path == tuple(path))
+
+    def is_settled(self):
+        return self.cycles >= c.NETWORK_SETTLE_CYCLES and self.area is not None
+
+    def settle(self):
+        """ Finds the way back and the area of the route, once it has gone the same way enough times.
+            Routes whose robots can't find their way back never settle.
+        """
+        end = self.path[-1] if self.path else (self.x, self.y)
+        result = pathing.path_cache.find_path(end, (self.x, self.y))
+        if result is None:
+            return
+        self.home_path, self.home_tile = tuple(result[0]), result[1]
+        tiles = [(self.x, self.y), self.deliver_tile] + list(self.path) + list(self.home_path)
+        self.area = (min(tile[0] for tile in tiles) - 1, min(tile[1] for tile in tiles) - 1,
+                     max(tile[0] for tile in tiles) + 1, max(tile[1] for tile in tiles) + 1)
+
+    def unsettle(self):
+        """ Makes the route measure its trips again, since the map changed along it.
+        """
+        self.cycles = 0
+        self.area = None
+        self.home_path = None
+        self.sent_tick = None
+
+    def is_near(self, x, y, distance):
+        """ Returns True if the tile x, y is at most "distance" tiles from the area of the route.
+        """
+        return (self.area[0] - distance <= x <= self.area[2] + distance and
+                self.area[1] - distance <= y <= self.area[3] + distance)
+
+
+class Trip(object):
+    """ A trip of a robot on a settled route that isn't simulated. It is put in the robots list of the factory
+        instead of the robot, so it has the attributes make_tile() uses to remove robots.
+    """
+    def __init__(self, route, sent_tick):
+        self.route = route
+        self.sent_tick = sent_tick
+        self.delivered = False
+        # Set when the trip is over, or when it was removed or turned into a robot, so that its events do nothing
+        self.delete = False
+
+    def return_request(self):
+        """ Gives back the goods the factory it was going to requested, if they weren't delivered.
+        """
+        if not self.delivered:
+            x, y = self.route.deliver_tile
+            try:
+                g.map[x][y].change_request(self.route.goods_name, 1)
+            except AttributeError:
+                pass
+
+
+class SettledNetworks(object):
+    """ Keeps the Routes of all factory robots, and the trips that are under way on settled routes,
+        in one bucket per tick like scheduler.TimerWheel. tick() should be called at the start of every tick,
+        where the robots would have been ticked, so that the trips do things on the same ticks as robots.
+    """
+    def __init__(self):
+        # {(x, y, robot_number): Route}
+        self.routes = {}
+        # {tick: [(Trip, function to call)]}
+        self.events = {}
+        # The trips under way
+        self.trips = set()
+        # Counters for how many trips weren't simulated and how many were turned back into robots
+        self.skipped = 0
+        self.resumed = 0
+
+    def clear(self):
+        """ Forgets all routes and trips. Should be called when a new map is loaded.
+        """
+        self.routes.clear()
+        self.events.clear()
+        self.trips.clear()
+
+    def player_tile(self):
+        if "player" in g.special_entity_list:
+            return g.special_entity_list["player"].get_tile()
+        return None
+
+    def is_watched(self, route):
+        """ Returns True if the player is near enough to the route to see its robots.
+            Routes that aren't settled are always simulated, so they don't count.
+        """
+        player_tile = self.player_tile()
+        if player_tile is None or route.area is None:
+            return False
+        return route.is_near(player_tile[0], player_tile[1], c.NETWORK_WAKE_DISTANCE)
+
+    def dispatch(self, factory, number, goods_name, path, deliver_tile):
+        """ Called by tiles.FactoryTile.dispatch_robot() before a robot is sent out.
+            Returns a Trip to put in the robots list of the factory if the trip doesn't need to be simulated,
+            and None if a robot should be sent out.
+        """
+        key = (factory.x, factory.y, number)
+        route = self.routes.get(key)
+        if route is None or not route.same_way(goods_name, path, deliver_tile):
+            route = Route(factory.x, factory.y, number, goods_name, path, deliver_tile)
+            self.routes[key] = route
+        now = scheduler.timer_wheel.current_tick
+
+        if c.SETTLE_NETWORKS and route.cycles >= c.NETWORK_SETTLE_CYCLES and route.area is None:
+            route.settle()
+        if not c.SETTLE_NETWORKS or not route.is_settled() or self.is_watched(route):
+            # Measure the robot
+            route.sent_tick = now
+            route.delivered = False
+            return None
+
+        route.sent_tick = None
+        trip = Trip(route, now)
+        self._schedule(trip, route.deliver_ticks, self._deliver)
+        self._schedule(trip, route.return_ticks, self._come_home)
+        self.trips.add(trip)
+        self.skipped += 1
+        return trip
+
+    def delivered(self, robot):
+        """ Called by units.Robot when it has given its goods to the factory it carried them to.
+        """
+        route = self._measured_route(robot)
+        if route is not None:
+            route.deliver_ticks = scheduler.timer_wheel.current_tick - robot.sent_tick
+            route.delivered = True
+
+    def returned(self, robot):
+        """ Called by units.Robot when it has come home. Counts the trip if the goods were delivered on the way.
+        """
+        route = self._measured_route(robot)
+        if route is None:
+            return
+        route.sent_tick = None
+        if route.delivered:
+            route.return_ticks = scheduler.timer_wheel.current_tick - robot.sent_tick
+            route.cycles += 1
+        else:
+            route.cycles = 0
+
+    def _measured_route(self, robot):
+        """ Returns the route robot is being measured on, or None if it isn't being measured.
+        """
+        if robot.home_tile is None or robot.sent_tick is None:
+            return None
+        route = self.routes.get((robot.home_tile[0], robot.home_tile[1], robot.number))
+        if route is None or route.sent_tick != robot.sent_tick:
+            return None
+        return route
+
+    def _schedule(self, trip, ticks, function):
+        due_tick = trip.sent_tick + max(ticks, 1)
+        if due_tick in self.events:
+            self.events[due_tick].append((trip, function))
+        else:
+            self.events[due_tick] = [(trip, function)]
+
+    def tick(self):
+        """ Does what the trips do this tick, and turns the trips the player has come near back into robots.
+        """
+        now = scheduler.timer_wheel.current_tick
+        due = self.events.pop(now, None)
+        if due is not None:
+            for trip, function in due:
+                if not trip.delete:
+                    function(trip)
+        if self.trips:
+            for trip in [trip for trip in self.trips if self.is_watched(trip.route)]:
+                self.resume(trip)
+
+    def _deliver(self, trip):
+        """ Gives the goods of the trip to the factory they were going to, like units.Robot.give_goods().
+        """
+        route = trip.route
+        trip.delivered = True
+        try:
+            g.map[route.deliver_tile[0]][route.deliver_tile[1]].recieve_goods(route.goods_name)
+        except AttributeError:
+            # If the factory tile was replaced, ignore it
+            pass
+        else:
+            metrics.production.delivered(route.x, route.y, route.goods_name,
+                                         scheduler.timer_wheel.current_tick - trip.sent_tick)
+
+    def _come_home(self, trip):
+        """ Ends the trip, like units.Robot.come_home().
+        """
+        trip.delete = True
+        self.trips.discard(trip)
+        try:
+            g.map[trip.route.x][trip.route.y].robot_returned(trip.route.number, c.ROBOT_COME_HOME_TIME)
+        except AttributeError:
+            pass
+
+    def resume(self, trip):
+        """ Turns a trip back into a robot where it would have been by now, walking the rest of the way.
+            Robots that are almost home are left to finish their trip.
+        """
+        route = trip.route
+        factory = g.map[route.x][route.y]
+        elapsed = scheduler.timer_wheel.current_tick - trip.sent_tick
+        if not trip.delivered:
+            path, end = route.path, route.deliver_tile
+            # The robot waits ROBOT_DELIVER_TIME ticks at the end of the path before it gives the goods away
+            walk_ticks = route.deliver_ticks - c.ROBOT_DELIVER_TIME
+            tiles = [(route.x, route.y)] + list(path)
+        else:
+            path, end = route.home_path, route.home_tile
+            elapsed -= route.deliver_ticks
+            walk_ticks = route.return_ticks - route.deliver_ticks - c.ROBOT_COME_HOME_TIME
+            tiles = [route.path[-1] if route.path else (route.x, route.y)] + list(path)
+        # The amount of tiles the robot has walked, assuming it walks as fast along the whole path
+        walked = min(len(path) * elapsed // max(walk_ticks, 1), len(path))
+        if trip.delivered and walked == len(path):
+            return
+        # Don't put it inside of a tile that was placed on the path
+        while walked > 0 and g.map.collides_at(*tiles[walked]):
+            walked -= 1
+
+        trip.delete = True
+        self.trips.discard(trip)
+        self.resumed += 1
+        robot = factory.make_robot(route.number, route.goods_name, tiles[walked][0], tiles[walked][1])
+        robot.sent_tick = trip.sent_tick
+        # The factory has to know about the robot, so that it is removed if the factory is replaced
+        factory.robots[route.number] = robot
+        if not trip.delivered:
+            if walked == len(path):
+                # Start waiting at the end of the path, with the time that is left
+                robot.follow_path([], end)
+                robot.deliver_timer = max(route.deliver_ticks - elapsed, 0)
+            else:
+                robot.follow_path(list(path[walked:]), end)
+        else:
+            robot.image = "robot_empty"
+            robot.paths_end_func = robot.come_home
+            robot.follow_path(list(path[walked:]), end)
+
+    def tile_changed(self, x, y):
+        """ Should be called after a tile that robots collide with was placed or removed at x, y.
+            The routes going past it have to settle again, and their trips are turned back into robots.
+        """
+        for trip in [trip for trip in self.trips if trip.route.area is not None and trip.route.is_near(x, y, 0)]:
+            self.resume(trip)
+        for route in self.routes.values():
+            if route.area is not None and route.is_near(x, y, 0):
+                route.unsettle()
+
+    def remove_tile(self, x, y):
+        """ Forgets the routes of the factory at x, y. Should be called when it is replaced.
+            Its trips are removed together with its robots by make_tile().
+        """
+        for key in [key for key in self.routes if key[:2] == (x, y)]:
+            del self.routes[key]
+        for trip in [trip for trip in self.trips if (trip.route.x, trip.route.y) == (x, y)]:
+            self.trips.discard(trip)
+
+
+# The settled networks of all factories
+settled_networks = SettledNetworks()
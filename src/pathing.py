@@ -0,0 +1,561 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/pathing.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the pathfinding engine used by entities.PathingEntity.
+    Works directly on tile coordinates in the g.map array and knows nothing about entities.
+"""
+import heapq
+from array import array
+from collections import OrderedDict, deque
+
+from src import globals as g
+from src import constants as c
+from src.tile_types import TYPES
+
+# Relative coordinates of all neighbours of a tile and the cost of moving there.
+# Orthogonal moves cost 10 and diagonal moves cost 14 (roughly 10 times the square root of two)
+ORTHOGONAL_NEIGHBOURS = ((1, 0, 10), (-1, 0, 10), (0, 1, 10), (0, -1, 10))
+DIAGONAL_NEIGHBOURS = ((1, 1, 14), (1, -1, 14), (-1, 1, 14), (-1, -1, 14))
+NEIGHBOURS = ORTHOGONAL_NEIGHBOURS + DIAGONAL_NEIGHBOURS
+
+
+def heuristic_cost_estimate(start, end):
+    """ Estimates the cost of walking from start to end, using the manhattan distance.
+    """
+    return 10 * (abs(start[0] - end[0]) + abs(start[1] - end[1]))
+
+
+def tile_collides(x, y):
+    """ Returns True if the tile at x, y collides with entities
+    """
+    return g.map.collides_at(x, y)
+
+
+def find_path(start, end):
+    """ Finds a path from start to end tiles using the A* algorithm with a binary heap as the open list.
+        "start" and "end" should be tuples with the x and y coordinates of a tile.
+        If the end tile collides, the path ends on a tile orthogonally next to it instead.
+
+        returns a tuple of the path (a list of tile coordinates, not including start) and the deliver tile,
+            or None if there is no path
+    """
+    if type(start) != tuple or type(end) != tuple:
+        raise Exception("Value passed to pathing.find_path() is not tuple")
+
+    # Tiles that finish the search. A colliding end tile can't be stood on, so stand next to it instead
+    if g.in_map(*end) and tile_collides(*end):
+        goals = set()
+        for relative_x, relative_y, cost in ORTHOGONAL_NEIGHBOURS:
+            goals.add((end[0] + relative_x, end[1] + relative_y))
+        goals.discard(end)
+    else:
+        goals = {end}
+
+    # The open list is a heap of (f, h, tile) tuples. Tiles are pushed again when a cheaper way to
+    # them is found, and the outdated entries are skipped when they are popped (lazy deletion).
+    start_h = heuristic_cost_estimate(start, end)
+    open_heap = [(start_h, start_h, start)]
+    # The G score (the cost to walk there from start) of every tile found so far
+    g_scores = {start: 0}
+    came_from = {start: None}
+    closed = set()
+    # Local names for what is looked up for every neighbour
+    width, height = g.width, g.height
+    collides = g.map.collides
+
+    while open_heap:
+        f_score, h_score, current = heapq.heappop(open_heap)
+        if current in closed:
+            continue
+        closed.add(current)
+
+        if current in goals:
+            path = []
+            while current != start:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path, end
+
+        x, y = current
+        current_g = g_scores[current]
+        for relative_x, relative_y, cost in NEIGHBOURS:
+            i = x + relative_x
+            j = y + relative_y
+            if not (0 <= i < width and 0 <= j < height):
+                continue
+            neighbour = (i, j)
+            if neighbour in closed or collides[i * height + j]:
+                continue
+            # Don't walk diagonally between two colliding tiles
+            if (relative_x and relative_y and
+                    collides[i * height + y] and collides[x * height + j]):
+                continue
+            g_score = current_g + cost
+            if neighbour not in g_scores or g_score < g_scores[neighbour]:
+                g_scores[neighbour] = g_score
+                came_from[neighbour] = current
+                h_score = 10 * (abs(i - end[0]) + abs(j - end[1]))
+                heapq.heappush(open_heap, (g_score + h_score, h_score, neighbour))
+
+    return None
+
+
+class PathCache(object):
+    """ Cache of paths found by find_path(), keyed by the start and end tiles.
+        The map is split into square regions which each have a revision number that is raised whenever
+        a tile in it changes collidability. Every cached path remembers the revisions of the regions it
+        was found through, and is thrown away when any of those have changed.
+    """
+    def __init__(self, region_size=c.PATH_CACHE_REGION_SIZE, max_size=c.PATH_CACHE_SIZE):
+        self.region_size = region_size
+        self.max_size = max_size
+        # {(start, end): (path, deliver_tile, {region: revision})}
+        self.paths = OrderedDict()
+        # {(region_x, region_y): revision}. Regions that never changed aren't in here and have revision 0
+        self.revisions = {}
+        # Counters for how well the cache works
+        self.hits = 0
+        self.misses = 0
+        # Searches that weren't done at all, since regions showed that the end couldn't be reached
+        self.rejected = 0
+
+    def clear(self):
+        """ Forgets all paths. Should be called when a new map is loaded.
+        """
+        self.paths.clear()
+        self.revisions.clear()
+
+    def tile_changed(self, x, y):
+        """ Tells the cache that the tile at x, y started or stopped colliding,
+            which makes all paths through that region outdated.
+        """
+        region = (x // self.region_size, y // self.region_size)
+        self.revisions[region] = self.revisions.get(region, 0) + 1
+
+    def _regions(self, start, end, path):
+        """ Returns the revisions of all regions the path depends on, which is the regions of every tile
+            on it, the end tile and the tiles next to diagonal steps that the corner rule looks at.
+        """
+        size = self.region_size
+        tiles = [start, end]
+        last = start
+        for tile in path:
+            tiles.append(tile)
+            if tile[0] != last[0] and tile[1] != last[1]:
+                tiles.append((tile[0], last[1]))
+                tiles.append((last[0], tile[1]))
+            last = tile
+        regions = {}
+        for x, y in tiles:
+            region = (x // size, y // size)
+            regions[region] = self.revisions.get(region, 0)
+        return regions
+
+    def find_path(self, start, end):
+        """ Works like find_path(), but returns a cached path if there is an up to date one.
+            Paths that couldn't be found aren't cached, since they depend on the whole map.
+        """
+        key = (start, end)
+        if key in self.paths:
+            path, deliver_tile, regions = self.paths[key]
+            for region, revision in regions.items():
+                if self.revisions.get(region, 0) != revision:
+                    del self.paths[key]
+                    break
+            else:
+                self.hits += 1
+                # Entities pop tiles off their path, so give them a copy
+                return list(path), deliver_tile
+
+        # Don't search the whole region around start for an end that is walled off from it
+        if not walkable_regions.reachable(start, end):
+            self.rejected += 1
+            return None
+
+        self.misses += 1
+        result = find_path(start, end)
+        if result is not None:
+            path, deliver_tile = result
+            self.paths[key] = (tuple(path), deliver_tile, self._regions(start, end, path))
+            if len(self.paths) > self.max_size:
+                self.paths.popitem(last=False)
+        return result
+
+
+class FlowFields(object):
+    """ Keeps one distance field per type of goods, holding the walking distance from every tile
+        to the nearest tile next to a factory that requests those goods.
+        A robot carrying goods then only has to walk downhill in the field to find its way,
+        instead of searching the map. Fields are only recomputed when they are asked for after
+        invalidate() has been called, which should happen whenever requests or collision tiles change.
+    """
+    def __init__(self):
+        # {"goods_name": [distance or None for every tile, indexed by x * height + y]}
+        self.fields = {}
+        # {"goods_name": {(x, y): (factory_x, factory_y)}}, the tiles that can deliver directly to a factory
+        self.deliver_tiles = {}
+        self.dirty = set(c.GOODS)
+        # {"goods_name": revision}, raised every time the field of goods_name is invalidated
+        self.revisions = dict.fromkeys(c.GOODS, 0)
+
+    def invalidate(self, goods_name=None):
+        """ Marks the field of goods_name as outdated, or all fields if goods_name is None.
+        """
+        if goods_name is None:
+            self.dirty.update(c.GOODS)
+            for name in c.GOODS:
+                self.revisions[name] += 1
+        else:
+            self.dirty.add(goods_name)
+            self.revisions[goods_name] += 1
+
+    def get_field(self, goods_name):
+        """ Returns the distance field and deliver tiles of goods_name, recomputing them first if needed.
+        """
+        if goods_name in self.dirty or goods_name not in self.fields:
+            self.dirty.discard(goods_name)
+            self.fields[goods_name], self.deliver_tiles[goods_name] = self._compute(goods_name)
+        return self.fields[goods_name], self.deliver_tiles[goods_name]
+
+    def _compute(self, goods_name):
+        """ Runs a Dijkstra search outwards from all tiles next to factories requesting goods_name.
+        """
+        width, height = g.width, g.height
+        types = g.map.types
+        tile_types = TYPES
+        collides = g.map.collides
+        field = [None] * (width * height)
+        deliver_tiles = {}
+        open_heap = []
+
+        # Factories always have their own Tile object, so only those need to be checked
+        for (x, y), tile in g.map.tiles.items():
+            if not tile_types[types[x * height + y]].factory_input:
+                continue
+            if tile.requests.get(goods_name, 0) <= 0:
+                continue
+            for relative_x, relative_y, cost in ORTHOGONAL_NEIGHBOURS:
+                i = x + relative_x
+                j = y + relative_y
+                if 0 <= i < width and 0 <= j < height and (i, j) not in deliver_tiles:
+                    deliver_tiles[(i, j)] = (x, y)
+                    # Colliding tiles can only deliver if a robot starts there, so they aren't searched from
+                    if not collides[i * height + j]:
+                        field[i * height + j] = 0
+                        open_heap.append((0, i, j))
+        heapq.heapify(open_heap)
+
+        while open_heap:
+            distance, x, y = heapq.heappop(open_heap)
+            if distance > field[x * height + y]:
+                continue
+            for relative_x, relative_y, cost in NEIGHBOURS:
+                i = x + relative_x
+                j = y + relative_y
+                if not (0 <= i < width and 0 <= j < height) or collides[i * height + j]:
+                    continue
+                if (relative_x and relative_y and
+                        collides[i * height + y] and collides[x * height + j]):
+                    continue
+                old_distance = field[i * height + j]
+                if old_distance is None or distance + cost < old_distance:
+                    field[i * height + j] = distance + cost
+                    heapq.heappush(open_heap, (distance + cost, i, j))
+
+        return field, deliver_tiles
+
+    def distance(self, start, goods_name):
+        """ Returns the walking distance from start to the nearest tile that can deliver goods_name to a factory,
+            or None if no such tile can be reached. Robots standing on a colliding tile start by stepping off of it.
+        """
+        field, deliver_tiles = self.get_field(goods_name)
+        if start in deliver_tiles:
+            return 0
+        height = g.height
+        collides = g.map.collides
+        x, y = start
+        if not collides[x * height + y]:
+            return field[x * height + y]
+        best = None
+        for relative_x, relative_y, cost in NEIGHBOURS:
+            i = x + relative_x
+            j = y + relative_y
+            if not g.in_map(i, j) or field[i * height + j] is None:
+                continue
+            if (relative_x and relative_y and
+                    collides[i * height + y] and collides[x * height + j]):
+                continue
+            if best is None or field[i * height + j] + cost < best:
+                best = field[i * height + j] + cost
+        return best
+
+    def find_path(self, start, goods_name):
+        """ Finds the way from start to the nearest factory requesting goods_name by walking downhill
+            in the distance field. "start" should be a tuple with the x and y coordinates of a tile.
+
+            returns a tuple of the path (a list of tile coordinates, not including start) and the
+                coordinates of the factory to deliver to, or None if no factory can be reached
+        """
+        field, deliver_tiles = self.get_field(goods_name)
+        if start in deliver_tiles:
+            return [], deliver_tiles[start]
+
+        height = g.height
+        collides = g.map.collides
+        path = []
+        x, y = start
+        distance = None if collides[x * height + y] else field[x * height + y]
+        while distance != 0:
+            best = None
+            for relative_x, relative_y, cost in NEIGHBOURS:
+                i = x + relative_x
+                j = y + relative_y
+                if not g.in_map(i, j) or field[i * height + j] is None:
+                    continue
+                if (relative_x and relative_y and
+                        collides[i * height + y] and collides[x * height + j]):
+                    continue
+                if best is None or field[i * height + j] + cost < best[0]:
+                    best = field[i * height + j] + cost, i, j
+            if best is None or (distance is not None and best[0] > distance):
+                # Nowhere downhill to go, so no factory can be reached from here
+                return None
+            x, y = best[1:]
+            distance = field[x * height + y]
+            path.append((x, y))
+        return path, deliver_tiles[(x, y)]
+
+
+class WalkableRegions(object):
+    """ Labels every tile that doesn't collide with the region it is in, where a region is all the tiles
+        an entity can walk between. That makes it possible to tell that there is no path between two tiles
+        without searching for one. Since diagonal steps aren't allowed between two colliding tiles,
+        a diagonal step can always be replaced by two orthogonal ones and regions only need to look at
+        orthogonal neighbours.
+        The labels are kept in a union-find structure. When a tile stops colliding, the regions around it
+        are joined by linking their labels, and when a tile starts colliding only the region it was in is
+        searched to see if it was split apart.
+        The map is labelled the first time the labels are needed after clear() has been called.
+    """
+    def __init__(self):
+        # [label for every tile, indexed by x * height + y], -1 for colliding tiles. None until labelled
+        self.labels = None
+        # The parent of every label. Labels that are their own parent are the root label of a region
+        self.parents = []
+        # Counter for how many tiles have been given new labels since the map was labelled
+        self.relabelled = 0
+
+    def clear(self):
+        """ Forgets all labels. Should be called when a new map is loaded.
+        """
+        self.labels = None
+        self.parents = []
+
+    def _new_label(self):
+        """ Returns a label that isn't used by any region.
+        """
+        self.parents.append(len(self.parents))
+        return len(self.parents) - 1
+
+    def _root(self, label):
+        """ Returns the root label of the region that label belongs to.
+        """
+        parents = self.parents
+        root = label
+        while parents[root] != root:
+            root = parents[root]
+        # Point every label on the way straight at the root, so the next lookup is faster
+        while parents[label] != root:
+            parents[label], label = root, parents[label]
+        return root
+
+    def _label_map(self):
+        """ Gives every tile on the map a label by flood filling one region at a time.
+        """
+        width, height = g.width, g.height
+        collides = g.map.collides
+        labels = self.labels = array("i", [-1]) * (width * height)
+        self.parents = []
+        for index in range(width * height):
+            if collides[index] or labels[index] != -1:
+                continue
+            label = self._new_label()
+            labels[index] = label
+            stack = [(index // height, index % height)]
+            while stack:
+                x, y = stack.pop()
+                for relative_x, relative_y, cost in ORTHOGONAL_NEIGHBOURS:
+                    i = x + relative_x
+                    j = y + relative_y
+                    if (0 <= i < width and 0 <= j < height and not collides[i * height + j] and
+                            labels[i * height + j] == -1):
+                        labels[i * height + j] = label
+                        stack.append((i, j))
+
+    def region(self, x, y):
+        """ Returns the root label of the region the tile at x, y is in, or None if it collides.
+        """
+        if self.labels is None:
+            self._label_map()
+        label = self.labels[x * g.height + y]
+        if label == -1:
+            return None
+        return self._root(label)
+
+    def reachable(self, start, end):
+        """ Returns False if find_path() can't possibly find a path from start to end, and True otherwise.
+            Follows the same rules as find_path(), so entities standing on a colliding tile can step off of it
+            and colliding end tiles are reached by standing next to them.
+        """
+        if not g.in_map(*start):
+            return True
+        if start == end:
+            return True
+
+        # The regions the first step from start can go into
+        if g.map.collides_at(*start):
+            x, y = start
+            start_regions = set()
+            for relative_x, relative_y, cost in NEIGHBOURS:
+                i = x + relative_x
+                j = y + relative_y
+                if not g.in_map(i, j) or tile_collides(i, j):
+                    continue
+                if relative_x and relative_y and tile_collides(i, y) and tile_collides(x, j):
+                    continue
+                start_regions.add(self.region(i, j))
+        else:
+            start_regions = {self.region(*start)}
+
+        # The tiles that finish the search, like in find_path()
+        if g.in_map(*end) and tile_collides(*end):
+            goals = [(end[0] + relative_x, end[1] + relative_y)
+                     for relative_x, relative_y, cost in ORTHOGONAL_NEIGHBOURS]
+        else:
+            goals = [end]
+        for goal in goals:
+            if goal == start:
+                return True
+            if g.in_map(*goal) and self.region(*goal) in start_regions:
+                return True
+        return False
+
+    def tile_changed(self, x, y):
+        """ Updates the labels around the tile at x, y after it started or stopped colliding.
+            Should be called after the tile has been changed on the map.
+        """
+        if self.labels is None:
+            # Nothing to update, the whole map is labelled when it's needed
+            return
+        index = x * g.height + y
+        if not tile_collides(x, y):
+            # The tile joins all regions next to it into one
+            roots = set()
+            for relative_x, relative_y, cost in ORTHOGONAL_NEIGHBOURS:
+                i = x + relative_x
+                j = y + relative_y
+                if g.in_map(i, j) and not tile_collides(i, j):
+                    roots.add(self.region(i, j))
+            if roots:
+                label = roots.pop()
+                for root in roots:
+                    self.parents[root] = label
+            else:
+                label = self._new_label()
+            self.labels[index] = label
+        else:
+            self.labels[index] = -1
+            # Neighbours that are still connected through the tiles around this one can't have been split apart
+            groups = self._local_groups(x, y)
+            if len(groups) > 1:
+                self._split(groups)
+
+    def _local_groups(self, x, y):
+        """ Groups the orthogonal neighbours of the tile at x, y that don't collide by if they can walk to each
+            other around the corners of that tile, and returns one neighbour from every group.
+        """
+        def walkable(i, j):
+            return g.in_map(i, j) and not tile_collides(i, j)
+
+        # The orthogonal neighbours in order around the tile. Two neighbours after each other share a corner
+        ring = ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y))
+        free = [walkable(i, j) for i, j in ring]
+        groups = []
+        for number in range(4):
+            if not free[number]:
+                continue
+            (i, j), (previous_i, previous_j) = ring[number], ring[number - 1]
+            if number > 0 and free[number - 1] and walkable(i + previous_i - x, j + previous_j - y):
+                groups[-1].append(ring[number])
+            else:
+                groups.append([ring[number]])
+        # The last and first neighbours share a corner too
+        (i, j), (previous_i, previous_j) = ring[0], ring[3]
+        if len(groups) > 1 and free[0] and free[3] and walkable(i + previous_i - x, j + previous_j - y):
+            groups[0].extend(groups.pop())
+        return [group[0] for group in groups]
+
+    def _split(self, starts):
+        """ Flood fills from all start tiles at once, one tile each at a time. Searches that find each other
+            are joined, and a search that runs out of tiles has found a region of its own, which gets a new
+            label. When only one search is left, the rest of the old region keeps its label.
+            That way only the smaller parts of a split region are ever searched through completely.
+        """
+        width, height = g.width, g.height
+        collides = g.map.collides
+        labels = self.labels
+        queues = dict((number, deque([tile])) for number, tile in enumerate(starts))
+        found = dict((number, [tile]) for number, tile in enumerate(starts))
+        owners = dict((tile, number) for number, tile in enumerate(starts))
+
+        while len(queues) > 1:
+            for number in list(queues):
+                if len(queues) == 1:
+                    break
+                if number not in queues:
+                    # It was joined with another search
+                    continue
+                queue = queues[number]
+                if not queue:
+                    # Closed off from all the other searches, so this is a region of its own
+                    label = self._new_label()
+                    for i, j in found[number]:
+                        labels[i * height + j] = label
+                    self.relabelled += len(found[number])
+                    del queues[number], found[number]
+                    continue
+
+                x, y = queue.popleft()
+                for relative_x, relative_y, cost in ORTHOGONAL_NEIGHBOURS:
+                    i = x + relative_x
+                    j = y + relative_y
+                    if not (0 <= i < width and 0 <= j < height) or collides[i * height + j]:
+                        continue
+                    owner = owners.get((i, j))
+                    if owner is None:
+                        owners[(i, j)] = number
+                        queue.append((i, j))
+                        found[number].append((i, j))
+                    elif owner != number:
+                        # The searches met, so join the smaller one into the bigger one
+                        small, big = sorted((owner, number), key=lambda search: len(found[search]))
+                        for tile in found[small]:
+                            owners[tile] = big
+                        found[big].extend(found.pop(small))
+                        queues[big].extend(queues.pop(small))
+                        number = big
+                        queue = queues[big]
+
+
+# The path cache used by all pathing entities
+path_cache = PathCache()
+# The flow fields used by all robots looking for somewhere to deliver their goods
+flow_fields = FlowFields()
+# The walkable regions of the map, used to tell when there is no path without searching for one
+walkable_regions = WalkableRegions()
@@ -39,12 +39,10 @@ class Player(entities.Entity):
         # If the player has opened a menu. If so, arrow keys should navigate the menu.
         self.browsing_menu = False
         
-    def paint(self):
-        """ Paints the player and its aim indicator on the screen.
-            Also paints the targets for the aimed at tile if it has any.
+    def aim_markers(self):
+        """ Returns a list of (image, x, y) with the world coordinates of the markers painted on top of the
+            player, which are the aim indicator and the targets of the aimed at tile if it has any.
         """
-        super(Player, self).paint()
-
         if self.removing_tile:
             if g.in_map(*self.get_aim_tile()) and g.get_img(*self.get_aim_tile()).destroy is not None:
                 aim = "remove_aim"
@@ -56,25 +54,51 @@ class Player(entities.Entity):
              (c.TILE_SIZE - g.images[aim].get_size()[0]) / 2)
         y = ((self.last_aim_tile[1]*c.TILE_SIZE) +
              (c.TILE_SIZE - g.images[aim].get_size()[1]) / 2)
-        g.screen.blit(g.images[aim].get(), (x, y))
+        markers = [(aim, x, y)]
 
         # When you aim at a factory, display the set targets for that tile
         if g.in_map(*self.last_aim_tile) and g.get_img(*self.last_aim_tile).factory_output:
             x, y = self.last_aim_tile
             if g.map[x][y].good_targets:
                 for good_target in list(g.map[x][y].good_targets.values()):
-                    g.screen.blit(g.images["tile_target_aim"].get(),
-                                  (good_target[0]*c.TILE_SIZE +
-                                   (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[0]) / 2,
-                                   good_target[1]*c.TILE_SIZE +
-                                   (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[1]) / 2))
+                    markers.append(("tile_target_aim",
+                                    good_target[0]*c.TILE_SIZE +
+                                    (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[0]) / 2,
+                                    good_target[1]*c.TILE_SIZE +
+                                    (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[1]) / 2))
             # Show the direction the selected launcher tile is shooting
             if type(g.map[x][y]) == tiles.LauncherTile and g.map[x][y].shoot_direction != (0, 0):
-                g.screen.blit(g.images["tile_target_aim"].get(),
-                              ((g.map[x][y].shoot_direction[0]+x)*c.TILE_SIZE +
-                               (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[0]) / 2,
-                              ((g.map[x][y].shoot_direction[1]+y)*c.TILE_SIZE +
-                               (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[1]) / 2)))
+                markers.append(("tile_target_aim",
+                                (g.map[x][y].shoot_direction[0]+x)*c.TILE_SIZE +
+                                (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[0]) / 2,
+                                (g.map[x][y].shoot_direction[1]+y)*c.TILE_SIZE +
+                                (c.TILE_SIZE - g.images["tile_target_aim"].get_size()[1]) / 2))
+        return markers
+
+    def screen_rect(self):
+        """ Returns a pygame.Rect of where on the screen the player and its markers are painted
+        """
+        rect = super(Player, self).screen_rect()
+        for image, x, y in self.aim_markers():
+            rect = rect.union(g.images[image].get().get_rect(topleft=g.camera.to_screen(x, y)))
+        return rect
+
+    def paint_key(self):
+        """ Returns something that changes whenever the player or its markers would be painted differently
+        """
+        return super(Player, self).paint_key() + tuple(self.aim_markers())
+
+    def paint(self):
+        """ Paints the player and its aim indicator on the screen.
+            Also paints the targets for the aimed at tile if it has any.
+
+            returns the pygame.Rect on the screen that was painted
+        """
+        rect = super(Player, self).paint()
+        for image, x, y in self.aim_markers():
+            marker_rect = g.screen.blit(g.images[image].get(), g.camera.to_screen(x, y))
+            rect = marker_rect if rect is None else rect.union(marker_rect)
+        return rect
 
     def update(self, time_diff):
         """ Calls the superclass update and updates the state of the aim marker.
@@ -95,14 +119,14 @@ class Player(entities.Entity):
             # Checks if the aim tile has a remove time (can be destroyed).
             # If so, assign that value to self.remove_timer.
             try:
-                if c.IMAGES[g.map[x][y].type].destroy is not None:
-                    self.remove_timer = c.IMAGES[g.map[x][y].type].destroy[0]
+                if g.get_img(x, y).destroy is not None:
+                    self.remove_timer = g.get_img(x, y).destroy[0]
                 elif type(g.map[x][y]) == tiles.MultiTilePointer:
                     # Finding out which tile the pointer is pointing to, and if that has a destroy value
                     head_x, head_y = g.map[x][y].target
                     multi_tile_head = g.map[head_x][head_y]
-                    if c.IMAGES[multi_tile_head.type].destroy is not None:
-                        self.remove_timer = c.IMAGES[multi_tile_head.type].destroy[0]
+                    if multi_tile_head.type_info.destroy is not None:
+                        self.remove_timer = multi_tile_head.type_info.destroy[0]
                     else:
                         self.remove_timer = None
                 else:
@@ -116,7 +140,7 @@ class Player(entities.Entity):
         # Placing tile
         if self.placing_tile and not self.removing_tile:
             try:
-                if c.IMAGES[g.map[x][y].type].placeable:
+                if g.map.placeable_at(x, y):
                     # If there is a special case for placing tiles, use that. Otherwise, use the default
                     tiles.make_tile(c.DEFAULT_PLACE_TILE, x, y)
             # Ignore IndexErrors because the indices might be outside of the map
@@ -142,13 +166,12 @@ class Player(entities.Entity):
             self.toggle_grab = False
             if self.following_entity is not None:
                 x, y = self.get_aim_tile()
-                if c.IMAGES[g.map[x][y].type].placeable:
+                if g.map.placeable_at(x, y):
                     g.special_entity_list[self.following_entity].target_coords = [x*c.TILE_SIZE,
                                                                                   y*c.TILE_SIZE]
             else:
                 if g.map[x][y].type in c.PACKAGE_TILE_NAMES.keys():
                     tiles.make_tile(c.PACKAGE_TILE_NAMES[g.map[x][y].type], x, y)
-                    g.update_map = True
                     units.Package(x*c.TILE_SIZE, y*c.TILE_SIZE, "player")
 
     def tick(self):
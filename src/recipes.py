@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/recipes.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the production graph, which is compiled once from the factory fields of the tile types
+    (factory_input, factory_output, factory_timer and evolve). Every factory type gets a Recipe,
+    which tiles.FactoryTile works from, and the graph links the factories making every type of goods
+    to the factories using them, for example ore_mine -> furnace -> battery_factory -> launcher.
+
+    solve() works out how many of every factory a chain needs for its last factory to work as fast as it can,
+    and how many goods per minute it then makes, using the robot speeds and times in constants.py.
+"""
+from src import tile_types
+from src import constants as c
+
+
+class Recipe(object):
+    """ What one type of factory needs, makes and how long it takes. Made from the TileType of the factory.
+    """
+    def __init__(self, tile_type):
+        self.name = tile_type.name
+        # ((goods_name, amount), ...) needed for every batch of output
+        self.inputs = tuple((good[0], good[1]) for good in tile_type.factory_input if good)
+        # ((robot number, goods_name, amount), ...) made by every batch. Every output has its own robot
+        self.outputs = tuple((i, good[0], good[1]) for i, good in enumerate(tile_type.factory_output) if good)
+        # The ticks it takes to make a batch once the inputs are there
+        self.timer = tile_type.factory_timer
+        # (min ticks, max ticks, tile type) if the factory turns into another tile once it has its inputs
+        self.evolve = tile_type.evolve
+        # The image shown while it works, if it has one
+        if tile_type.factory_alt_image is not None and not tile_type.random:
+            self.alt_image = tile_type.factory_alt_image
+        else:
+            self.alt_image = None
+        # Factories that evolve only use their inputs once, so they can't be part of a steady chain
+        self.one_shot = self.evolve is not None
+        # Launchers shoot their output instead of sending it with robots
+        self.launches = self.name == "launcher"
+
+    def cycle_ticks(self):
+        """ Returns the least amount of ticks between the starts of two batches.
+            A batch is started the tick after the last one is done, so it's one more than the timer.
+        """
+        return self.timer + 1
+
+    def max_rate(self, goods_name, distance):
+        """ Returns the most goods_name per tick one factory can make and get rid of,
+            when its robots walk "distance" tiles to the factory using the goods.
+        """
+        for number, output_name, amount in self.outputs:
+            if output_name == goods_name:
+                break
+        else:
+            return 0.0
+        if self.launches:
+            # Rockets are used up by shooting them, one every shot
+            send_rate = 1.0 / (c.LAUNCHER_SHOOT_SPEED + 1)
+        else:
+            # Every output has one robot, which carries one of the goods at a time
+            send_rate = 1.0 / robot_round_trip(distance)
+        if not self.inputs:
+            # Factories without inputs (like mines) make their goods as fast as they can be sent
+            return send_rate
+        return min(float(amount) / self.cycle_ticks(), send_rate)
+
+    def __repr__(self):
+        return "Recipe({name}: {inputs} -> {outputs} in {timer} ticks)".format(
+            name=self.name, inputs=list(self.inputs), outputs=[output[1:] for output in self.outputs],
+            timer=self.timer)
+
+
+def robot_round_trip(distance):
+    """ Returns the ticks it takes a robot to carry goods "distance" tiles, hand them over and come back
+        ready to carry the next goods.
+    """
+    # The pixels a robot moves every tick
+    speed = c.ROBOT_MOVEMENT_SPEED * c.TICK_FREQ
+    walk = distance * c.TILE_SIZE / speed
+    # Robots wait ROBOT_COME_HOME_TIME ticks both to get back inside and to set out again
+    return 2 * walk + c.ROBOT_DELIVER_TIME + 2 * c.ROBOT_COME_HOME_TIME
+
+
+def ticks_to_minutes(ticks):
+    """ Returns how many minutes "ticks" ticks take.
+    """
+    return ticks * c.TICK_FREQ / 60.0
+
+
+# The Recipe of every factory type, by tile type name
+RECIPES = {}
+for _tile_type in tile_types.TYPES[1:]:
+    if _tile_type.is_factory:
+        RECIPES[_tile_type.name] = Recipe(_tile_type)
+# {"goods_name": [names of the factory types making it]} and {"goods_name": [names of the factory types using it]}
+PRODUCERS = {}
+CONSUMERS = {}
+for _recipe in sorted(RECIPES.values(), key=lambda recipe: recipe.name):
+    for _number, _goods_name, _amount in _recipe.outputs:
+        PRODUCERS.setdefault(_goods_name, []).append(_recipe.name)
+    for _goods_name, _amount in _recipe.inputs:
+        CONSUMERS.setdefault(_goods_name, []).append(_recipe.name)
+
+
+def edges():
+    """ Returns the edges of the production graph as a sorted list of (producer, goods_name, consumer) tuples.
+    """
+    return sorted((producer, goods_name, consumer)
+                  for goods_name in PRODUCERS for producer in PRODUCERS[goods_name]
+                  for consumer in CONSUMERS.get(goods_name, ()))
+
+
+def end_recipes():
+    """ Returns the names of the factory types at the ends of the chains, the ones whose output isn't used by
+        any other factory that can keep working. Factories that only work once (evolving ones) are left out.
+    """
+    ends = []
+    for name, recipe in sorted(RECIPES.items()):
+        if recipe.one_shot or not recipe.inputs:
+            continue
+        if not any(not RECIPES[consumer].one_shot
+                   for number, goods_name, amount in recipe.outputs for consumer in CONSUMERS.get(goods_name, ())):
+            ends.append(name)
+    return ends
+
+
+class Plan(object):
+    """ The result of solve(): how many of every factory type a chain needs and how much it makes.
+    """
+    def __init__(self, recipe_name, rate, buildings, goods_rates, distance):
+        self.recipe_name = recipe_name
+        # The batches per tick the last factory of the chain makes
+        self.rate = rate
+        # {factory type: amount}, where the amounts aren't rounded, so they are the ratios between the factories
+        self.buildings = buildings
+        # {"goods_name": goods per tick} for everything made in the chain
+        self.goods_rates = goods_rates
+        self.distance = distance
+
+    def per_minute(self, goods_name=None):
+        """ Returns how many goods_name the chain makes every minute, or how many batches its last factory
+            makes every minute if goods_name is None.
+        """
+        rate = self.rate if goods_name is None else self.goods_rates.get(goods_name, 0.0)
+        return rate / ticks_to_minutes(1)
+
+    def __str__(self):
+        lines = ["{name}: {rate:.1f} per minute with robots walking {distance} tiles".format(
+            name=self.recipe_name, rate=self.per_minute(), distance=self.distance)]
+        for name, amount in sorted(self.buildings.items()):
+            lines.append("    {amount:.2f} {name}".format(amount=amount, name=name))
+        for goods_name in sorted(self.goods_rates):
+            lines.append("    {goods}: {rate:.1f} per minute".format(goods=goods_name,
+                                                                  rate=self.per_minute(goods_name)))
+        return "\n".join(lines)
+
+
+def _add_demand(goods_name, rate, distance, buildings, goods_rates, visiting):
+    """ Adds the factories needed to make "rate" goods_name per tick to buildings, and what they need in turn.
+    """
+    producers = [name for name in PRODUCERS.get(goods_name, ()) if not RECIPES[name].one_shot]
+    if not producers:
+        raise ValueError("Nothing makes " + goods_name + " over and over")
+    if goods_name in visiting:
+        raise ValueError(goods_name + " is needed to make itself")
+    # If several factory types make the goods, use the fastest one
+    name = max(producers, key=lambda producer: RECIPES[producer].max_rate(goods_name, distance))
+    recipe = RECIPES[name]
+    goods_rates[goods_name] = goods_rates.get(goods_name, 0.0) + rate
+    buildings[name] = buildings.get(name, 0.0) + rate / recipe.max_rate(goods_name, distance)
+
+    # The batches per tick needed, and the inputs they use
+    amount = [output[2] for output in recipe.outputs if output[1] == goods_name][0]
+    batches = float(rate) / amount
+    for input_name, input_amount in recipe.inputs:
+        _add_demand(input_name, batches * input_amount, distance, buildings, goods_rates, visiting | {goods_name})
+
+
+def solve(recipe_name, distance=c.RECIPE_PLAN_DISTANCE):
+    """ Works out how many of every factory type are needed to keep one factory of type recipe_name working
+        as fast as it can, when robots walk "distance" tiles between the factories.
+
+        returns a Plan
+    """
+    recipe = RECIPES[recipe_name]
+    if recipe.outputs:
+        # As fast as it can make and get rid of its slowest output
+        rate = min(recipe.max_rate(goods_name, distance) / amount for number, goods_name, amount in recipe.outputs)
+    else:
+        rate = 1.0 / recipe.cycle_ticks()
+    buildings = {recipe_name: 1.0}
+    goods_rates = {}
+    for number, goods_name, amount in recipe.outputs:
+        goods_rates[goods_name] = rate * amount
+    for goods_name, amount in recipe.inputs:
+        _add_demand(goods_name, rate * amount, distance, buildings, goods_rates, set())
+    return Plan(recipe_name, rate, buildings, goods_rates, distance)
+
+
+def solve_all(distance=c.RECIPE_PLAN_DISTANCE):
+    """ Returns a Plan for every chain, keyed by the name of the factory type at its end.
+    """
+    return dict((name, solve(name, distance)) for name in end_recipes())
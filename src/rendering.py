@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/rendering.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the Renderer class, which paints the game on the screen.
+    When only entities have moved, only the parts of the screen where they were and where they are now
+    are painted again, and only those parts of the window are updated.
+    Also contains the MetricsOverlay, which shows the production metrics of the factory the player aims at.
+"""
+import pygame
+
+from src import maps
+from src import metrics
+from src import globals as g
+from src import constants as c
+
+
+class Renderer(object):
+    """ Paints the map, the entities and the menus on g.screen. Remembers where every entity was painted,
+        so that paint_dirty() can find the parts of the screen that have changed.
+    """
+    def __init__(self):
+        # {entity: (paint key, pygame.Rect on the screen)} for the entities painted last time.
+        # The rect is None if the entity wasn't visible
+        self.painted = {}
+        # The amount of times the whole screen and parts of it have been painted
+        self.full_paints = 0
+        self.dirty_paints = 0
+        # Painted on top of the entities, and found to need painting again in the same way as them
+        self.overlay = MetricsOverlay()
+
+    def entities(self):
+        """ Returns all entities in the order they are painted in, followed by the metrics overlay
+        """
+        return g.entity_list[::-1] + list(g.special_entity_list.values())[::-1] + [self.overlay]
+
+    @staticmethod
+    def _paint_menus():
+        """ Paints the menus, which are always on top of everything else
+        """
+        for item in list(g.non_entity_list.values())[::-1]:
+            item.paint()
+
+    def paint(self):
+        """ Paints the whole screen and updates the whole window.
+        """
+        self.full_paints += 1
+        g.screen.fill(c.BACKGROUND_COLOR)
+        # Draw the part of the map that the camera sees on the screen
+        maps.chunk_cache.paint(g.camera)
+        # Draw the objects
+        self.painted = {}
+        for entity in self.entities():
+            self.painted[entity] = (entity.paint_key(), entity.paint())
+        self._paint_menus()
+
+        # Update the display
+        pygame.display.flip()
+
+    def paint_dirty(self):
+        """ Paints only the parts of the screen where entities have moved, disappeared or changed since the last
+            time the screen was painted, and updates only those parts of the window.
+            Should only be used if nothing else has changed. Paints the whole screen with paint()
+            if the parts that changed cover a large part of the screen.
+        """
+        dirty_rects = []
+        painted = {}
+        entities = self.entities()
+        for entity in entities:
+            key = entity.paint_key()
+            old = self.painted.get(entity)
+            if old is not None and old[0] == key:
+                painted[entity] = old
+                continue
+            rect = entity.screen_rect()
+            painted[entity] = (key, rect)
+            if old is not None and old[1] is not None:
+                # Where it was and where it is now are usually next to each other, so paint them as one rect
+                dirty_rects.append(rect.union(old[1]))
+            else:
+                dirty_rects.append(rect)
+        # Entities that are gone
+        for entity, (key, rect) in self.painted.items():
+            if entity not in painted and rect is not None:
+                dirty_rects.append(rect)
+
+        screen_rect = g.screen.get_rect()
+        dirty_rects = [rect.clip(screen_rect) for rect in dirty_rects if rect.colliderect(screen_rect)]
+        if not dirty_rects:
+            self.painted = painted
+            return
+        if sum(rect.width * rect.height for rect in dirty_rects) > screen_rect.width * screen_rect.height * 0.5:
+            # Painting the parts one by one would be slower than painting everything
+            self.paint()
+            return
+
+        self.dirty_paints += 1
+        for dirty_rect in dirty_rects:
+            # Only paint inside of the rect
+            g.screen.set_clip(dirty_rect)
+            g.screen.fill(c.BACKGROUND_COLOR)
+            maps.chunk_cache.paint(g.camera)
+            for entity in entities:
+                rect = painted[entity][1]
+                if rect is not None and rect.colliderect(dirty_rect):
+                    painted[entity] = (painted[entity][0], entity.paint())
+            self._paint_menus()
+        g.screen.set_clip(None)
+        self.painted = painted
+
+        pygame.display.update(dirty_rects)
+
+
+class MetricsOverlay(object):
+    """ Shows the production metrics of the factory the player is aiming at in the top left corner of the screen.
+        Has the same paint methods as entities, so that Renderer can paint it like one.
+    """
+    def __init__(self):
+        self.font = None
+        # The lines of text that self.surface was made for
+        self.lines = None
+        self.surface = None
+
+    @staticmethod
+    def factory():
+        """ Returns the tile coordinates of the factory the player is aiming at, or None if it isn't aiming at one
+        """
+        player = g.special_entity_list.get("player")
+        if player is None:
+            return None
+        x, y = player.get_aim_tile()
+        if not g.in_map(x, y) or not g.get_img(x, y).is_factory:
+            return None
+        return x, y
+
+    def is_shown(self):
+        """ Returns True if the overlay is shown, which is when the player is aiming at a factory
+        """
+        return self.factory() is not None
+
+    def text(self):
+        """ Returns the lines of text to show, or an empty tuple if nothing should be shown
+        """
+        tile = self.factory()
+        if tile is None:
+            return ()
+        seconds = int(round(c.METRICS_WINDOW_TICKS * c.TICK_FREQ))
+        lines = ["{type} at {x}, {y}, the last {seconds} seconds".format(type=g.get_img(*tile).name, x=tile[0],
+                                                                         y=tile[1], seconds=seconds)]
+        for goods_name, counts in sorted(metrics.production.factory_window(*tile).items()):
+            latency = "-" if counts["latency"] is None else str(int(round(counts["latency"])))
+            lines.append("{goods}: produced {produced}, sent {robots}, delivered {delivered}, recieved {recieved}, "
+                         "failed searches {failed_searches}, delivery ticks {latency}".format(
+                             goods=goods_name, latency=latency,
+                             **dict((name, counts[name]) for name in metrics.COUNTER_NAMES if name != "latency")))
+        if len(lines) == 1:
+            lines.append("Nothing yet")
+        return tuple(lines)
+
+    def _get_surface(self):
+        """ Returns the surface with the text painted on it, making it again if the text has changed
+        """
+        lines = self.text()
+        if lines != self.lines:
+            self.lines = lines
+            if not lines:
+                self.surface = None
+            else:
+                if self.font is None:
+                    self.font = pygame.font.Font("freesansbold.ttf", c.METRICS_FONT_SIZE)
+                rendered = [self.font.render(line, True, c.METRICS_FONT_COLOR) for line in lines]
+                # Space between the text and the edge of the background
+                padding = c.METRICS_FONT_SIZE // 2
+                width = max(line.get_width() for line in rendered) + 2 * padding
+                height = sum(line.get_height() for line in rendered) + 2 * padding
+                self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+                self.surface.fill(c.METRICS_BACKGROUND_COLOR)
+                y = padding
+                for line in rendered:
+                    self.surface.blit(line, (padding, y))
+                    y += line.get_height()
+        return self.surface
+
+    def paint_key(self):
+        """ Returns the text shown, which changes whenever the overlay would be painted differently
+        """
+        return self.text()
+
+    def screen_rect(self):
+        """ Returns a pygame.Rect of where on the screen the overlay is painted, which has no size when it isn't shown
+        """
+        surface = self._get_surface()
+        if surface is None:
+            return pygame.Rect(c.BORDER_MARGINS, c.BORDER_MARGINS, 0, 0)
+        return surface.get_rect(topleft=(c.BORDER_MARGINS, c.BORDER_MARGINS))
+
+    def paint(self):
+        """ Paints the overlay on the screen if the player is aiming at a factory
+
+            returns the pygame.Rect on the screen that was painted, or None if nothing was painted
+        """
+        surface = self._get_surface()
+        if surface is None:
+            return None
+        return g.screen.blit(surface, (c.BORDER_MARGINS, c.BORDER_MARGINS))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/scheduler.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the timer wheel that calls time_up() on evolving tiles (like saplings and dirt)
+    when their timer runs out, so that they don't have to be ticked every tick just to count down.
+    Factories use it to sleep until they have something to do as well.
+"""
+from src import globals as g
+
+
+class TimerWheel(object):
+    """ Keeps the tiles waiting for their timer in one bucket per tick, keyed by the tick they are due on.
+        Starting a timer and finding the tiles that are due are both O(1), and tiles are only touched
+        when their timer is up.
+    """
+    def __init__(self):
+        # The amount of ticks that have been run
+        self.current_tick = 0
+        # {tick: [(tile, function to call) for the timers due on that tick]}
+        self.buckets = {}
+
+    def clear(self):
+        """ Forgets all timers. Should be called when a new map is loaded.
+        """
+        self.buckets.clear()
+
+    def schedule(self, tile, ticks, function=None):
+        """ Makes tile.time_up() get called "ticks" ticks from now. Should be at least 1.
+            "function" is called instead of tile.time_up() if it is given, and should be a method of tile.
+        """
+        due_tick = self.current_tick + max(ticks, 1)
+        if function is None:
+            function = tile.time_up
+        if due_tick in self.buckets:
+            self.buckets[due_tick].append((tile, function))
+        else:
+            self.buckets[due_tick] = [(tile, function)]
+
+    def tick(self):
+        """ Advances the wheel one tick and calls time_up() (or the given function) on all tiles that are due.
+            Tiles that have been replaced on the map since their timer was started are skipped.
+        """
+        self.current_tick += 1
+        due_tiles = self.buckets.pop(self.current_tick, None)
+        if due_tiles is None:
+            return
+        for tile, function in due_tiles:
+            # Tiles with a timer always have their own object in the map, so if it isn't the same object,
+            # the tile has been destroyed or replaced
+            if g.map.tiles.get((tile.x, tile.y)) is tile:
+                function()
+
+    def __len__(self):
+        """ Returns the amount of timers waiting
+        """
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+
+# The timer wheel used by all tiles
+timer_wheel = TimerWheel()
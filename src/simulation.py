@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/simulation.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the Simulation class, which runs the game logic (ticking tiles and entities and moving
+    entities) separately from the window, the keyboard and the real time clock.
+    main.py uses it for the normal game, and run_headless() uses it to run the game as fast as possible
+    without a window, for example for testing how well a factory layout performs.
+"""
+import random
+import time
+
+import pygame
+
+from src import tiles
+from src import players
+from src import maps
+from src import entities
+from src import logistics
+from src import networks
+from src import scheduler
+from src import camera
+from src import graphics
+from src import globals as g
+from src import constants as c
+
+
+def start_game(seed=None):
+    """ Initializes pygame, generates a new map and creates the player.
+        "seed" is used to seed the random module before the map is generated, if it isn't None.
+    """
+    if seed is not None:
+        random.seed(seed)
+    pygame.init()
+
+    # Make map
+    maps.load_map(maps.generate_map())
+    # maps.load_map()
+
+    # Initiate player
+    g.special_entity_list["player"] = players.Player(g.player_start_x, g.player_start_y)
+
+
+class Simulation(object):
+    """ Runs the game logic. tick() and update() are the two phases of the game loop, and can be called
+        by something that keeps track of real time, like main.main(). step() runs whole ticks at once
+        with a fixed time difference for every update, as fast as possible.
+    """
+    def __init__(self, fixed_dt=c.TICK_FREQ):
+        """ "fixed_dt" is the simulated time in seconds that step() moves entities in each update.
+            It should divide c.TICK_FREQ evenly.
+        """
+        self.fixed_dt = fixed_dt
+        # The amount of ticks that have been run since the simulation was created
+        self.ticks = 0
+
+    def tick(self):
+        """ Ticks all entities, and the tiles and factories that are due on the timer wheel
+            (makes them do whatever they do every tick).
+        """
+        # Robots that aren't simulated do what they do where the robots would have been ticked
+        networks.settled_networks.tick()
+        for i in range(len(g.entity_list)-1, -1, -1):
+            entity = g.entity_list[i]
+            if entity.tick() == "delete":
+                entities.spatial_hash.remove(entity)
+                del g.entity_list[i]
+                g.force_update = True
+        for entity in list(g.special_entity_list.values()):
+            entity.tick()
+        # No tiles are ticked every tick. Call time_up() on the tiles whose timers have run out,
+        # and let the factories that woke up work
+        scheduler.timer_wheel.tick()
+        # Send out robots with the goods the factories offered
+        logistics.dispatcher.dispatch()
+        self.ticks += 1
+
+    def update(self, time_diff):
+        """ Moves all entities "time_diff" seconds, makes the tiles in g.tile_maker_queue and updates the painted map.
+
+            returns True if any entity or menu moved, so that the screen needs to be redrawn
+        """
+        entity_has_moved = False
+        if g.entity_list:
+            for i in range(len(g.entity_list)-1, -1, -1):
+                entity = g.entity_list[i]
+                entity.update(time_diff)
+                # Check if any of them have moved
+                if entity.has_moved():
+                    entity_has_moved = True
+        if g.special_entity_list:
+            for entity in list(g.special_entity_list.values()):
+                # Update all entities and check for if any of them is a package that just finished moving.
+                # If so, skip the has_moved check for that entity.
+                if entity.update(time_diff) == "deleted":
+                    continue
+                if entity.has_moved():
+                    entity_has_moved = True
+        if "tile_target" in g.special_entity_list:
+            while g.tile_target_selection[0] >= g.width:
+                g.tile_target_selection[0] -= g.width
+            while g.tile_target_selection[0] < 0:
+                g.tile_target_selection[0] += g.width
+
+            while g.tile_target_selection[1] >= g.height:
+                g.tile_target_selection[1] -= g.height
+            while g.tile_target_selection[1] < 0:
+                g.tile_target_selection[1] += g.height
+
+            g.special_entity_list["tile_target"].x = g.tile_target_selection[0] * c.TILE_SIZE
+            g.special_entity_list["tile_target"].y = g.tile_target_selection[1] * c.TILE_SIZE
+        if g.non_entity_list:
+            for item in list(g.non_entity_list.values()):
+                try:
+                    if item.update(time_diff):
+                        entity_has_moved = True
+                except AttributeError:
+                    pass
+
+        # Check if any tiles need to be updated.
+        if g.tile_maker_queue:
+            while g.tile_maker_queue:
+                tiles.make_tile(*g.tile_maker_queue.pop())
+
+        # Update the painted map if needed. All chunks are only thrown away when a map is loaded,
+        # otherwise only the chunks with tiles that changed are repainted, once they are shown.
+        if g.update_map:
+            g.update_map = False
+            g.force_update = True
+            maps.chunk_cache.clear()
+            g.dirty_tiles.clear()
+        elif g.dirty_tiles:
+            g.force_update = True
+            maps.update_dirty_tiles()
+
+        return entity_has_moved
+
+    def step(self, n_ticks=1):
+        """ Runs n_ticks ticks, each followed by the updates that fill the time until the next tick,
+            without waiting for real time to pass.
+        """
+        updates_per_tick = max(int(round(c.TICK_FREQ / self.fixed_dt)), 1)
+        for i in range(n_ticks):
+            self.tick()
+            for j in range(updates_per_tick):
+                self.update(self.fixed_dt)
+
+
+def run_headless(ticks, seed=None, fixed_dt=c.TICK_FREQ):
+    """ Runs the game for "ticks" ticks without showing it and prints how many ticks per second it managed.
+        The SDL_VIDEODRIVER environment variable should be set to "dummy" before pygame is imported.
+    """
+    start_game(seed)
+    # Images need a display mode to be loaded, even if nothing is ever shown
+    g.screen = pygame.display.set_mode(camera.window_size())
+    graphics.convert_graphics(g.images)
+    simulation = Simulation(fixed_dt)
+
+    time_start = time.time()
+    simulation.step(ticks)
+    time_taken = time.time() - time_start
+
+    if time_taken > 0:
+        print(ticks, "ticks in", round(time_taken, 3), "seconds,", round(ticks / time_taken, 1), "ticks per second")
+    else:
+        print(ticks, "ticks in", round(time_taken, 3), "seconds")
+    return simulation
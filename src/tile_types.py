@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding=utf-8
+""" Module /src/tile_types.py
+    TileGame for Python 3
+    Code and lead design by ZeeQyu
+    Graphics by Pokemania00
+    https://github.com/ZeeQyu/TileGame
+
+    Module containing the tile type registry, which is built once from c.IMAGES.
+    Every tile type gets an integer id and a TileType object that is shared by all tiles of that type,
+    so the map can store tiles in arrays and the game doesn't have to look things up by name all the time.
+    Images get integer ids too.
+"""
+from src import constants as c
+
+# The neighbours of a microtile, clockwise starting with the top left corner. In a neighbour mask,
+# bit i is set if neighbour i is of the same type as the microtile (or outside of the map)
+MICROTILE_NEIGHBOURS = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
+
+
+def _microtile_shape(mask):
+    """ Returns the shape of the neighbour mask as a string of 8 ones or zeros, in the same order as
+        MICROTILE_NEIGHBOURS, with lonely corners removed (see doc/microtiles.txt)
+    """
+    shape_list = [str((mask >> i) & 1) for i in range(8)]
+    for i in range(0, 7, 2):
+        if shape_list[i - 1] == "0" or shape_list[i + 1] == "0":
+            shape_list[i] = "0"
+    return "".join(shape_list)
+
+# The shape of every neighbour mask. There are 47 different shapes
+MICROTILE_SHAPES = [_microtile_shape(_mask) for _mask in range(256)]
+
+
+class TileType(object):
+    """ Everything about a tile type, shared by all tiles of that type. Has the same attributes as the
+        c.IMAGES Img object it's made from, so it can be used in place of one, as well as some that are
+        worked out once here instead of every time they are needed.
+    """
+    def __init__(self, type_id, name, img):
+        self.id = type_id
+        self.name = name
+        self.img = img
+        # Copied from the Img
+        self.png = img.png
+        self.color_code = img.color_code
+        self.random = img.random
+        self.collides = img.collides
+        self.placeable = img.placeable
+        self.destroy = img.destroy
+        self.evolve = img.evolve
+        self.multi_tile = img.multi_tile
+        self.factory_input = img.factory_input
+        self.factory_output = img.factory_output
+        self.factory_timer = img.factory_timer
+        self.factory_alt_image = img.factory_alt_image
+        self.microtiles = img.microtiles
+        self.rotates = img.rotates
+
+        # If tiles of this type are factories, which send or receive goods
+        self.is_factory = bool(self.factory_input or self.factory_output)
+        # If tiles of this type are plain tiles.Tile objects without any state of their own,
+        # which the map can keep in its arrays only (see grid.needs_object())
+        self.plain = (not self.is_factory and self.multi_tile is None and self.microtiles is None and
+                      self.evolve is None and name != "launcher")
+        # The images a new tile of this type can get. Random tiles can have any image that is the name
+        # of the type, optionally followed by a number (for example "grass" and "grass5")
+        if self.random and not c.DEACTIVATE_RANDOM_TEXTURES:
+            self.variants = []
+            for image in sorted(c.IMAGES.keys()):
+                if image.startswith(name) and (image[len(name):].isdigit() or len(image) == len(name)):
+                    self.variants.append(image)
+        else:
+            self.variants = [name]
+        # The image name of microtiles of this type for every neighbour mask
+        if self.microtiles is not None:
+            self.microtile_images = [name + shape for shape in MICROTILE_SHAPES]
+        else:
+            self.microtile_images = None
+
+
+# Tile type names by id and ids by name. Id 0 means that there is no tile there yet.
+TYPE_NAMES = [None] + sorted(c.IMAGES.keys())
+TYPE_IDS = {}
+for _i, _name in enumerate(TYPE_NAMES):
+    TYPE_IDS[_name] = _i
+# The TileType of every tile type id, and of every name
+TYPES = [None] + [TileType(_i, _name, c.IMAGES[_name]) for _i, _name in enumerate(TYPE_NAMES) if _name is not None]
+TYPES_BY_NAME = {}
+for _tile_type in TYPES[1:]:
+    TYPES_BY_NAME[_tile_type.name] = _tile_type
+# The name of the tile type each map.png color code stands for
+TYPES_BY_COLOR = {}
+for _tile_type in TYPES[1:]:
+    if _tile_type.color_code is not None and tuple(_tile_type.color_code) not in TYPES_BY_COLOR:
+        TYPES_BY_COLOR[tuple(_tile_type.color_code)] = _tile_type.name
+
+# Image names by id and ids by name. Images are added as they are used, since some images
+# (like rotated launchers and microtile combinations) are created while the game is running.
+IMAGE_NAMES = [None]
+IMAGE_IDS = {None: 0}
+
+
+def image_id(name):
+    """ Returns the id of the image name, giving it a new id if it doesn't have one.
+    """
+    if name not in IMAGE_IDS:
+        IMAGE_IDS[name] = len(IMAGE_NAMES)
+        IMAGE_NAMES.append(name)
+    return IMAGE_IDS[name]
@@ -14,10 +14,17 @@
 from random import choice, randint
 
 import pygame
-from src.graphics import Graphics
 from src import globals as g, units
 from src import constants as c
 from src import entities
+from src import logistics
+from src import map_generation
+from src import metrics
+from src import networks
+from src import pathing
+from src import recipes
+from src import scheduler
+from src import tile_types
 
 
 class AreaNotFreeException(Exception):
@@ -36,44 +43,35 @@ class Tile(object):
             "type" should be a string from the list of keys in the c.py IMAGES dictionary.
             "x" and "y" should be ints and can be used for finding out where a tile belongs if
                 you copy the tile away from the map array in main.py. They are not normally used.
-            "timer" should be the time until time_up() is called. If this is the base class
         """
         # Type of tile, for identification purposes.
         # Can be accessed directly, but not for image getting purposes
         # get_image() should be used instead
         self.type = type
+        # The tile_types.TileType with everything about this type of tile
+        self.type_info = tile_types.TYPES_BY_NAME[type]
         self.x = x
         self.y = y
-        # If the tile evolves, get a random timer for that
-        if c.IMAGES[type].evolve is not None:
-            # Make sure it doesn't get added to tick_tiles twice
-            if not c.IMAGES[type].factory_output:
-                g.tick_tiles.append([x, y])
-            if not c.IMAGES[type].factory_input:
-                self.timer = randint(*c.IMAGES[type].evolve[:2])
-            else:
-                self.timer = None
-        else:
-            self.timer = None
-
-        if c.IMAGES[type].random and not c.DEACTIVATE_RANDOM_TEXTURES:
-            image_keys = []
-            for image in list(c.IMAGES.keys()):
-                if image.startswith(type) and (image[len(type):].isdigit() or len(image) == len(type)):
-                    image_keys.append(image)
-            self.image = choice(image_keys)
+        # The tick of the timer wheel time_up() is called on, or None if no timer has been started
+        self.timer = None
+        # If the tile evolves, start a random timer for that.
+        # Factories start theirs when they're done working instead
+        if self.type_info.evolve is not None and not self.type_info.factory_input:
+            self.start_timer(randint(*self.type_info.evolve[:2]))
+
+        # Pick one of the textures of random tiles. Tiles that aren't random only have one
+        if len(self.type_info.variants) > 1:
+            self.image = choice(self.type_info.variants)
         else:
-            self.image = self.type 
+            self.image = self.type
         
-    def tick(self):
-        """ Method for counting down the block replacement timer.
-            Should only be called if the tile is a transforming tile (for example, sapling)
+    def start_timer(self, ticks):
+        """ Makes time_up() get called after "ticks" ticks have passed, counted from the next tick,
+            and one more tick for the timer to run out. This is when timers that counted down
+            every tick called it.
         """
-        if self.timer is not None:
-            if self.timer < 0:
-                self.time_up()
-            else:
-                self.timer -= 1
+        self.timer = scheduler.timer_wheel.current_tick + ticks + 2
+        scheduler.timer_wheel.schedule(self, ticks + 2)
     
     def rect(self):
         """ Returns a pygame.Rect object with the same dimensions and location as the tile
@@ -87,28 +85,30 @@ class Tile(object):
         return self.image
 
     def time_up(self):
-        """ The function that should be called when self.timer has reached 0
+        """ The function that is called by the timer wheel when self.timer has run out
             Exchanges this tile for the appropriate tile specified in the c.IMAGES variable
         """
         # Check if the entity evolves
-        if c.IMAGES[self.type].evolve is not None:
+        if self.type_info.evolve is not None:
             has_entities = False
             # Check if any entity is on that tile
-            if c.IMAGES[c.IMAGES[self.type].evolve[2]].collides:
+            if tile_types.TYPES_BY_NAME[self.type_info.evolve[2]].collides:
                 has_entities = not entities.free_of_entities(self)
             if not has_entities:
-                make_tile(c.IMAGES[self.type].evolve[2], self.x, self.y)
-                g.tick_tiles.remove([self.x, self.y])
-                return
-        else:
-            g.tick_tiles.remove([self.x, self.y])
+                make_tile(self.type_info.evolve[2], self.x, self.y)
+            else:
+                # Try again next tick
+                self.timer = scheduler.timer_wheel.current_tick + 1
+                scheduler.timer_wheel.schedule(self, 1)
         
     def __str__(self):
         """ Returns tile type and location (all attributes)
         """
+        # Show the ticks left until the timer runs out
+        timer = self.timer - scheduler.timer_wheel.current_tick if self.timer is not None else None
         template = "{id} tile of type {type} at x {x} y {y} with evolve timer {timer}"
         return template.format(id=self.type, x=self.x, y=self.y,
-                               type=type(self), timer=self.timer)
+                               type=type(self), timer=timer)
     
     def __eq__(self, other):
         """ Compares the type attribute
@@ -154,68 +154,68 @@ class MicroTile(Tile):
         self.update_microtile = True
 
     def get_image(self):
-        """ Returns the image unless microtiles need to be updated. If so, this checks surrounding tiles for
-            the constellation of neighbours and either creates it from quarters or gets a cached one from
-            the image list.
+        """ Returns the image unless the microtile needs to be updated. If so, this checks the surrounding tiles
+            for the constellation of neighbours and picks the image with that shape.
 
             Microtile combinations are named after the constellation of surrounding squares it represents,
-            using a 8 character binary combination corresponding to neighbours in a clockwise rotational order
+            using a 8 character binary combination corresponding to neighbours in a clockwise rotational order.
+            All of them are made when the graphics are loaded.
         """
-        if not c.DEACTIVATE_MICROTILES:
-            if g.update_microtiles or self.update_microtile:
-                self.update_microtile = False
-                # This is a list of 8 ones or zeros denoting which neighbour tiles are of the same type
-                # It's a list because strings can't be easily modified
-                shape_list = []
-
-                # Add all neighbours in clockwise order, starting with top left corner
-                for relative_x, relative_y in [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]:
-                    shape_list.append(str(int(_compare_tile(self.type, self.x + relative_x, self.y + relative_y))))
-                # Removes lonely corners (see doc/microtiles.txt)
-                for i in range(0, 7, 2):
-                    if shape_list[i - 1] == "0" or shape_list[i + 1] == "0":
-                        shape_list[i] = "0"
-                # Convert to a string
-                shape = "".join(shape_list)
-                if self.type + shape in g.images:
-                    self.image = self.type + shape
-                else:
-                    # If the tile doesn't exist, create it
-                    new_image = pygame.Surface((c.TILE_SIZE, c.TILE_SIZE))
-                    # Defines which quartet is being manipulated, clockwise, starting with top left
-                    pos = -1
-
-                    for j in range(0, 7, 2):
-                        pos += 1
-                        corner = shape[j-1] + shape[j] + shape[j+1]
-                        quartet_number, rotation, mirror = c.MICROTILE_LEGEND[corner]
-                        # Find the corresponding quartet
-                        quartet = g.images[c.IMAGES[self.type].microtiles[quartet_number]].get()
-                        if mirror:
-                            # Mirror the quartet horizontally
-                            quartet = pygame.transform.flip(quartet, True, False)
-                        if (rotation - pos*90) != 0:
-                            quartet = pygame.transform.rotate(quartet, rotation - pos*90)
-                        new_image.blit(quartet, (0, 0))
-
-                    g.images[self.type + shape] = Graphics(new_image)
-                    self.image = self.type + shape
-
+        if not c.DEACTIVATE_MICROTILES and self.update_microtile:
+            self.update_microtile = False
+            self.image = self.type_info.microtile_images[_microtile_mask(self.type_info.id, self.x, self.y)]
         return self.image
 
 
-def _compare_tile(type, x, y):
-    """ Compares the type of the tile at the specified coordinate with the specified type.
-        Assumes yes if out of bounds.
+def _microtile_mask(type_id, x, y):
+    """ Returns the neighbour mask of the tile at x, y, with a bit set for each neighbour that has the type id
+        "type_id" (see tile_types.MICROTILE_NEIGHBOURS). Tiles outside of the map count as the same type.
     """
-    if 0 <= x < g.width and 0 <= y < g.height:
-        return g.map[x][y].type == type
-    else:
-        return True
+    mask = 0
+    for bit, (relative_x, relative_y) in enumerate(tile_types.MICROTILE_NEIGHBOURS):
+        neighbour_x = x + relative_x
+        neighbour_y = y + relative_y
+        if (not (0 <= neighbour_x < g.map.width and 0 <= neighbour_y < g.map.height) or
+                g.map.types[neighbour_x * g.map.height + neighbour_y] == type_id):
+            mask |= 1 << bit
+    return mask
+
+
+def update_microtiles():
+    """ Updates the images of all microtiles in the map at once. Should be called when a map has been loaded.
+        With NumPy, the neighbour masks of the whole map are worked out in one pass over the type array.
+    """
+    if c.DEACTIVATE_MICROTILES:
+        return
+    microtiles = [tile for tile in g.map.tiles.values() if type(tile) == MicroTile]
+    # map_generation decides if NumPy is used, so that all modules agree on it
+    numpy = map_generation.numpy
+    if numpy is None:
+        for tile in microtiles:
+            tile.update_microtile = True
+            tile.get_image()
+        return
+
+    types = numpy.frombuffer(g.map.types, dtype=numpy.uint16).reshape(g.map.width, g.map.height)
+    # Pad the map with a border that is the same type as everything, so tiles outside count as the same
+    for type_id in set(tile.type_info.id for tile in microtiles):
+        same = numpy.pad(types == type_id, 1, mode="constant", constant_values=True)
+        masks = numpy.zeros(types.shape, dtype=numpy.uint8)
+        for bit, (relative_x, relative_y) in enumerate(tile_types.MICROTILE_NEIGHBOURS):
+            masks |= same[1 + relative_x:1 + relative_x + g.map.width,
+                          1 + relative_y:1 + relative_y + g.map.height].astype(numpy.uint8) << bit
+        masks = masks.tolist()
+        for tile in microtiles:
+            if tile.type_info.id == type_id:
+                tile.update_microtile = False
+                tile.image = tile.type_info.microtile_images[masks[tile.x][tile.y]]
 
 
 class FactoryTile(Tile):
     """ A FactoryTile is a tile that gives out or takes in resources and might do something else.
+        Like all other tiles, factories aren't ticked every tick. They sleep until wake() is called, either by
+        themselves when a timer of theirs runs out or by something that gives them work, like goods arriving
+        or a robot coming home, and catch up on the ticks they slept through when they wake up.
     """
     def __init__(self, tile_type, x, y):
         super(FactoryTile, self).__init__(tile_type, x, y)
@@ -223,165 +223,218 @@ class FactoryTile(Tile):
 
         self.goods_timer = -1
         self.robots = []
-        if c.IMAGES[self.type].factory_output:
-            g.tick_tiles.append([self.x, self.y])
+        # The tick of the timer wheel this factory last worked on, and the ticks it will wake up on
+        self.last_tick = scheduler.timer_wheel.current_tick
+        self.wake_ticks = set()
+        self.wake()
 
         self.good_targets = {}
-        # Contains the last paths for all robots by number. (ex: {1: [(1,5), (1,4), (1,3)], 2: [(65, 33), (66, 33)]}
-        self.last_paths = {}
-        # Contains last delivery tiles for all robots by number. (example: {1: (2,3), 2: (5,7)}  )
-        self.last_delivery_tiles = {}
 
+        # What the factory needs and makes, from the production graph in recipes.py
+        self.recipe = recipes.RECIPES[tile_type]
         self.inventory = {}
         self.requests = {}
-        for item in c.IMAGES[self.type].factory_input:
-            self.requests[item[0]] = item[1]
+        for good_name, good_amount in self.recipe.inputs:
+            self.set_request(good_name, good_amount)
 
     def tick(self):
         """ Decreases the timer until this tile sends new goods. Sets the timer to -1 after it sends goods.
         """
+        recipe = self.recipe
         # If the timer's up, add a timer until the goods can be sent.
-        if self.goods_timer == -1:
-            can_start_timer = True
-            if c.IMAGES[self.type].factory_input:
-                for good in c.IMAGES[self.type].factory_input:
-                    if good:
-                        good_name, good_amount = good
-                        # If the tile has the good
-                        if good_name in self.inventory:
-                            # If the entity has enough of said goods.
-                            # If the goods in the inventory >= the amount of goods in the IMAGES list required
-                            # start a timer to add the produced goods
-                            if not self.inventory[good_name] >= good_amount:
-                                can_start_timer = False
-                                break
-                        else:
-                            can_start_timer = False
-                            break
-
-                if can_start_timer:
-                    for good_name, good_amount in c.IMAGES[self.type].factory_input:
-                        self.inventory[good_name] -= good_amount
-                    self.goods_timer = c.IMAGES[self.type].factory_timer
-                    # Make sure it can accept more items if it's not about to evolve.
-                    if not c.IMAGES[self.type].evolve is not None:
-                        for item in c.IMAGES[self.type].factory_input:
-                            self.requests[item[0]] = item[1]
-                    # Set the image to the working image
-                    if c.IMAGES[self.type].factory_alt_image is not None and not c.IMAGES[self.type].random:
-                        self.image = c.IMAGES[self.type].factory_alt_image
-                        g.update_map = True
+        if self.goods_timer == -1 and recipe.inputs:
+            # If the tile has enough of all the goods its recipe needs, start a timer to add the produced goods
+            for good_name, good_amount in recipe.inputs:
+                if self.inventory.get(good_name, 0) < good_amount:
+                    break
+            else:
+                for good_name, good_amount in recipe.inputs:
+                    self.inventory[good_name] -= good_amount
+                self.goods_timer = recipe.timer
+                # Make sure it can accept more items if it's not about to evolve.
+                if recipe.evolve is None:
+                    for good_name, good_amount in recipe.inputs:
+                        self.set_request(good_name, good_amount)
+                # Set the image to the working image
+                if recipe.alt_image is not None:
+                    self.image = recipe.alt_image
+                    g.dirty_tiles.add((self.x, self.y))
 
         if self.goods_timer == 0:
-            if c.IMAGES[self.type].evolve is not None and self.timer is None:
-                self.timer = randint(*c.IMAGES[self.type].evolve[:2])
+            if recipe.evolve is not None and self.timer is None:
+                self.start_timer(randint(*recipe.evolve[:2]))
             else:
-                for good in c.IMAGES[self.type].factory_output:
-                    if good:
-                        good_name, good_amount = good
-                        if good_name in self.inventory:
-                            self.inventory[good_name] += good_amount
-                        else:
-                            self.inventory[good_name] = good_amount
+                for number, good_name, good_amount in recipe.outputs:
+                    if good_name in self.inventory:
+                        self.inventory[good_name] += good_amount
+                    else:
+                        self.inventory[good_name] = good_amount
+                    metrics.production.count(self.x, self.y, good_name, metrics.PRODUCED, good_amount)
             # Reset the image when the factory is done working
-            if c.IMAGES[self.type].factory_alt_image is not None and not c.IMAGES[self.type].random:
+            if recipe.alt_image is not None:
                 self.image = self.type
-                g.update_map = True
+                g.dirty_tiles.add((self.x, self.y))
 
         if self.goods_timer >= 0:
             self.goods_timer -= 1
 
         self.send_goods()
 
-        super(FactoryTile, self).tick()
+    def wake(self, ticks=1):
+        """ Makes the factory work (call tick()) "ticks" ticks from now.
+            Should be called by anything that might give the factory something to do.
+        """
+        due_tick = scheduler.timer_wheel.current_tick + max(ticks, 1)
+        if due_tick not in self.wake_ticks:
+            self.wake_ticks.add(due_tick)
+            scheduler.timer_wheel.schedule(self, ticks, self._woken)
+
+    def _woken(self):
+        """ Called by the timer wheel when the factory wakes up. Works for this tick and then goes back to sleep
+            until one of its timers runs out.
+        """
+        now = scheduler.timer_wheel.current_tick
+        self.wake_ticks.discard(now)
+        if now == self.last_tick:
+            # It has already worked this tick
+            return
+        self.catch_up(now - 1)
+        self.last_tick = now
+        self.tick()
+        self.sleep()
+
+    def catch_up(self, current_tick=None):
+        """ Counts down the timers for the ticks the factory slept through, up to and including current_tick
+            (the last tick the timer wheel finished if it's None). Has to be called before anything
+            changes the timers or the inventory from outside of tick().
+        """
+        if current_tick is None:
+            current_tick = scheduler.timer_wheel.current_tick
+        slept = current_tick - self.last_tick
+        if slept <= 0:
+            return
+        self.last_tick = current_tick
+        # The timers were never allowed to reach zero while it slept, so this is the same as counting every tick
+        if self.goods_timer >= 0:
+            self.goods_timer -= slept
+        for i, good_name in self._robots_counting():
+            self.robots[i] = max(self.robots[i] - slept, 0)
+
+    def _robots_counting(self):
+        """ Returns the numbers and goods of the robots that are counting down until they can be sent out again.
+            They only count down while the factory has goods for them to carry.
+        """
+        counting = []
+        for i, good_name, good_amount in self.recipe.outputs:
+            if i < len(self.robots) and type(self.robots[i]) is int and self.robots[i] > 0:
+                if not self.recipe.inputs or self.inventory.get(good_name, 0) > 0:
+                    counting.append((i, good_name))
+        return counting
+
+    def sleep(self):
+        """ Makes the factory wake up on the tick the first of its timers runs out.
+            If no timers are running, it sleeps until something else wakes it.
+        """
+        wake_times = [self.robots[i] for i, good_name in self._robots_counting()]
+        if self.goods_timer >= 0:
+            # The goods are done on the tick that starts with the timer at zero
+            wake_times.append(self.goods_timer + 1)
+        elif self.recipe.inputs and all(self.inventory.get(good_name, 0) >= good_amount
+                                        for good_name, good_amount in self.recipe.inputs):
+            # It already has the inputs for the next batch, which starts next tick
+            wake_times.append(1)
+        if wake_times:
+            self.wake(min(wake_times))
 
     def send_goods(self):
-        """ Sends its goods with a pathfinding robot to the nearest applicable factory if the corresponding
-            robot is "home", that is, not outside the building.
-            Should be called about every tick
+        """ Offers its goods to logistics.dispatcher for every robot that is "home", that is, not outside the
+            building. The dispatcher sends the robot out with dispatch_robot() when it finds somewhere for
+            the goods to go.
+            Called by tick() every time the factory works.
         """
-        i = -1
-        for good in c.IMAGES[self.type].factory_output:
-            i += 1
-            if good:
-                good_name, good_amount = good
-                if c.IMAGES[self.type].factory_input:
-                    if not (good_name in self.inventory and self.inventory[good_name] > 0):
-                        continue
-
-                # Is the robot home?
-                if len(self.robots) > i:
-                    if type(self.robots[i]) is int and self.robots[i] >= 0:
-                        self.robots[i] -= 1
-                    # If it's zero, all the below code happens.
-                    if self.robots[i] != 0:
-                        continue
-                else:
-                    self.robots.append(c.ROBOT_RETRY_TIME)
-                robot = units.Robot(self.x * c.TILE_SIZE, self.y * c.TILE_SIZE,
-                                    c.GOODS[good_name][0],
-                                    c.ROBOT_MOVEMENT_SPEED)
-
-                # used_last_path = False
-                # # Use last path
-                # if i in self.last_delivery_tiles and g.get_img(*self.last_delivery_tiles[i]).factory_input:
-                #     if (good_name in self.good_targets and
-                #             self.good_targets[good_name] == self.last_delivery_tiles[i]):
-                #         # Check last path
-                #         for tile in self.last_paths[i]:
-                #             if g.get_img(*tile).collides:
-                #                 used_last_path = True
-                #                 break
-                #         # Valid path
-                #         else:
-                #             robot.path = self.last_paths[i]
-                #             robot.deliver_tile = self.last_delivery_tiles[i]
-                #             robot.next_target_tile()
-                #             print("Used last path")
-
-                # if used_last_path is False:
-                # Straight pathfind
-                can_recieve = False
-                if good_name in self.good_targets:
-                    for reciever_good in g.get_img(*self.good_targets[good_name]).factory_input:
-                        if reciever_good[0] == good_name:
-                            can_recieve = True
-                    if can_recieve:
-                        if robot.pathfind(self.good_targets[good_name], good_name):
-                            robot.home_tile = (self.x, self.y)
-                        else:
-                            can_recieve = False
-
-                # Circular pathfind
-                if not can_recieve and not robot.goods_pathfind(good_name):
-                    robot.delete = True
-                    self.robots[i] = c.ROBOT_RETRY_TIME
+        for i, good_name, good_amount in self.recipe.outputs:
+            if self.recipe.inputs:
+                if not (good_name in self.inventory and self.inventory[good_name] > 0):
                     continue
 
-                # Save the path
-                self.last_paths[i] = robot.path
-                self.last_delivery_tiles[i] = robot.deliver_tile
+            # Is the robot home?
+            if len(self.robots) > i:
+                if type(self.robots[i]) is int and self.robots[i] > 0:
+                    self.robots[i] -= 1
+                # If it's zero, the robot is ready to carry goods.
+                if self.robots[i] != 0:
+                    continue
+            else:
+                self.robots.append(0)
+            # Offering the same robot again while it waits does nothing
+            logistics.dispatcher.offer(self.x, self.y, i, good_name)
 
-                # If any of the pathfindings work
-                self.robots[i] = robot
-                robot.number = i
-                robot.goods = good_name
-                if c.IMAGES[self.type].factory_input:
-                    self.inventory[good_name] -= 1
+    def dispatch_robot(self, number, goods_name, path, deliver_tile):
+        """ Sends out the robot with the number "number" carrying goods_name along path to deliver_tile.
+            Called by logistics.dispatcher when it has found somewhere for the goods to go.
+        """
+        self.catch_up()
+        # Robots on settled routes far away from the player aren't simulated
+        robot = networks.settled_networks.dispatch(self, number, goods_name, path, deliver_tile)
+        if robot is None:
+            robot = self.make_robot(number, goods_name, self.x, self.y)
+            robot.sent_tick = scheduler.timer_wheel.current_tick
+            robot.follow_path(path, deliver_tile)
+        self.robots[number] = robot
+        metrics.production.count(self.x, self.y, goods_name, metrics.ROBOTS)
+        if self.recipe.inputs:
+            self.inventory[goods_name] -= 1
+        else:
+            # Factories without input (like mines) make their goods as they send them
+            metrics.production.count(self.x, self.y, goods_name, metrics.PRODUCED)
+
+    def make_robot(self, number, goods_name, x, y):
+        """ Makes the robot with the number "number" carrying goods_name on the tile x, y.
+            It doesn't go anywhere until it is given a path.
+        """
+        robot = units.Robot(x * c.TILE_SIZE, y * c.TILE_SIZE,
+                            c.GOODS[goods_name][0],
+                            c.ROBOT_MOVEMENT_SPEED)
+        robot.home_tile = (self.x, self.y)
+        robot.number = number
+        robot.goods = goods_name
+        return robot
+
+    def set_request(self, goods_name, amount):
+        """ Sets how many of goods_name this tile requests.
+            Should be used instead of changing self.requests directly, since the flow field of those goods
+            needs to be recomputed if this tile starts or stops requesting them, and logistics.dispatcher
+            keeps a ledger of all requests.
+        """
+        was_requesting = self.requests.get(goods_name, 0) > 0
+        self.requests[goods_name] = amount
+        if was_requesting != (amount > 0):
+            pathing.flow_fields.invalidate(goods_name)
+        logistics.dispatcher.set_demand(self.x, self.y, goods_name, amount)
+
+    def change_request(self, goods_name, amount):
+        """ Adds amount (which can be negative) to the amount of goods_name this tile requests.
+        """
+        self.set_request(goods_name, self.requests[goods_name] + amount)
 
     def recieve_goods(self, goods_name):
         """ Adds the recieved goods to the inventory of this tile.
         """
+        self.catch_up()
         if goods_name in self.inventory:
             self.inventory[goods_name] += 1
         else:
             self.inventory[goods_name] = 1
+        metrics.production.count(self.x, self.y, goods_name, metrics.RECIEVED)
+        self.wake()
 
     def robot_returned(self, number, time=c.ROBOT_LOAD_TIME):
+        self.catch_up()
         if len(self.robots) > number:
             self.robots[number] = time
         else:
             self.robots.append(time)
+        self.wake()
 
 
 class LauncherTile(FactoryTile):
@@ -390,7 +443,6 @@ class LauncherTile(FactoryTile):
     """
     def __init__(self, tile_type, x, y):
         super(LauncherTile, self).__init__(tile_type, x, y)
-        g.tick_tiles.append([x, y])
         self.shoot_direction = (0, 0)
         self.shoot_timer = -1
         self.angle = 0
@@ -398,7 +450,8 @@ class LauncherTile(FactoryTile):
         # self.inventory["rocket"] = 1
 
     def send_goods(self):
-        """ This is called every tick and overwrites sending object functionality, which Launchers shouldn't have.
+        """ This is called every time the launcher works and overwrites sending object functionality,
+            which Launchers shouldn't have.
         """
         if "rocket" in self.inventory and self.inventory["rocket"] > 0 and self.shoot_timer == -1:
             self.shoot_timer = c.LAUNCHER_SHOOT_SPEED
@@ -422,18 +475,18 @@ class LauncherTile(FactoryTile):
             self.angle = 0
 
         if self.angle != self.last_angle:
-            g.update_map = True
+            g.dirty_tiles.add((self.x, self.y))
             self.last_angle = self.angle
 
-            # Creating the rotated images
-            key = self.type
-            if self.angle != 0:
-                key += str(self.angle)
-            if key in g.images:
-                self.image = key
-            else:
-                g.images[key] = Graphics(pygame.transform.rotate(g.images[self.type].get(), self.angle))
-                self.image = key
+            # The rotated images are made when the graphics are loaded
+            self.image = g.images[self.type].rotation_names[self.angle // 45 % 8]
+
+    def sleep(self):
+        """ Keeps the launcher awake every tick while it has a direction and rockets to shoot or is counting down.
+        """
+        super(LauncherTile, self).sleep()
+        if self.shoot_direction != (0, 0) and (self.shoot_timer > -1 or self.inventory.get("rocket", 0) > 0):
+            self.wake()
 
     def shoot(self):
         if c.NORMAL_DEBUG:
@@ -455,7 +508,7 @@ def area_is_free(x, y, width, height):
     for i in range(x, x+width):
         for j in range(y, y+height):
             # If any of the tiles aren't placeable, it isn't free.
-            if c.IMAGES[g.map[i][j].type].placeable is False:
+            if not g.map.placeable_at(i, j):
                 is_free = False
             else:
 #                 units.Package(i * c.TILE_SIZE, j * c.TILE_SIZE, custom_name="areapackage" + str(i) + "." + str(j))
@@ -478,17 +531,26 @@ def make_tile(tile_type, x, y, target=None):
             a pointer. It should be left empty if the tile isn't a multi-tile pointer.
     """
     during_generation = False
+    # The type of the tile that is being replaced, read from the map arrays
+    old_type = g.map.type_at(x, y)
+    old_info = g.map.type_info_at(x, y)
+    new_info = tile_types.TYPES_BY_NAME[tile_type]
     # Check if where you're placing the tile is subject to a special tile.
-    if g.map[x][y]:
-        if c.SPECIAL_PLACE_TILES.__contains__(tile_type + "+" + str(g.map[x][y].type)):
-            return make_tile(c.SPECIAL_PLACE_TILES[tile_type + "+" + str(g.map[x][y].type)], x, y)
+    if old_type is not None:
+        if c.SPECIAL_PLACE_TILES.__contains__(tile_type + "+" + old_type):
+            return make_tile(c.SPECIAL_PLACE_TILES[tile_type + "+" + old_type], x, y)
     else:
         # If the tile didn't exist before, the entire map is currently being generated
         during_generation = True
+    # Forget the goods the old factory offered and requested
+    if old_type is not None and old_info.is_factory:
+        logistics.dispatcher.remove_tile(x, y)
+        metrics.production.remove_tile(x, y)
+        networks.settled_networks.remove_tile(x, y)
 
     # If it is a multi-tile
-    if c.IMAGES[tile_type].multi_tile is not None:
-        width, height = c.IMAGES[tile_type].multi_tile
+    if new_info.multi_tile is not None:
+        width, height = new_info.multi_tile
         if not area_is_free(x, y, width, height):
             raise AreaNotFreeException("The area at x " + x + ", y " + y +
                                        ", with the width " + width + " and the height " +
@@ -501,7 +563,7 @@ def make_tile(tile_type, x, y, target=None):
                 if x == i and y == j:
                     continue
                 # On all others, make pointers
-                if c.IMAGES[tile_type].collides:
+                if new_info.collides:
                     make_tile("collide_pointer", i, j, (x, y))
                 else:
                     make_tile("pointer", i, j, (x, y))
@@ -509,7 +571,7 @@ def make_tile(tile_type, x, y, target=None):
         tile = MultiTileHead(tile_type, x, y, width, height)
     else:
         # Remove all robots if it's a robot sending factory tile.
-        if g.map[x][y] is not None and g.get_img(x, y).factory_output and type(g.map[x][y]) is not LauncherTile:
+        if old_type is not None and old_info.factory_output and type(g.map[x][y]) is not LauncherTile:
             for robot in g.map[x][y].robots:
                 if type(robot) is not int:
                     robot.delete = True
@@ -520,15 +582,30 @@ def make_tile(tile_type, x, y, target=None):
             tile = MultiTilePointer(tile_type, x, y, *target)
         elif tile_type == "launcher":
             tile = LauncherTile(tile_type, x, y)
-        elif c.IMAGES[tile_type].factory_input or c.IMAGES[tile_type].factory_output:
+        elif new_info.is_factory:
             tile = FactoryTile(tile_type, x, y)
-        elif c.IMAGES[tile_type].microtiles:
+        elif new_info.microtiles:
             tile = MicroTile(tile_type, x, y)
         else:
             tile = Tile(tile_type, x, y)
+    # Factories receiving goods and collision tiles both change where robots can deliver goods
+    if (old_type is None or old_info.collides != new_info.collides or
+            old_info.factory_input or new_info.factory_input):
+        pathing.flow_fields.invalidate()
+    collision_changed = old_type is not None and old_info.collides != new_info.collides
+    if collision_changed:
+        pathing.path_cache.tile_changed(x, y)
+
     # Change and update the map
     g.map[x][y] = tile
-    g.update_map = True
+    if collision_changed:
+        pathing.walkable_regions.tile_changed(x, y)
+        networks.settled_networks.tile_changed(x, y)
+    if during_generation:
+        # The whole map is painted again once the map is loaded
+        g.update_map = True
+    else:
+        g.dirty_tiles.add((x, y))
     # Make sure the player doesn't have to move to update to remove a newly placed package
     if "player" in g.special_entity_list:
         if g.special_entity_list["player"].get_aim_tile() == (x, y):
@@ -536,10 +613,11 @@ def make_tile(tile_type, x, y, target=None):
 
     if not during_generation:
         # Make sure microtiles update
-        for relative_x in range(-1, 2):
-            for relative_y in range(-1, 2):
-                if type(g.map[x + relative_x][y + relative_y]) == MicroTile:
-                    g.map[x + relative_x][y + relative_y].update_microtile = True
+        for i in range(x - 1, x + 2):
+            for j in range(y - 1, y + 2):
+                if g.in_map(i, j) and type(g.map.tiles.get((i, j))) == MicroTile:
+                    g.map.tiles[(i, j)].update_microtile = True
+                    g.dirty_tiles.add((i, j))
 
     return tile
 
@@ -550,13 +628,13 @@ def destroy_tile(x, y):
             type(g.map[x][y]) == MultiTilePointer)):
         # Get the destroy value
         if type(g.map[x][y]) == MultiTileHead:
-            destroy_value = c.IMAGES[g.map[x][y].type].destroy
+            destroy_value = g.get_img(x, y).destroy
             multi_tile = {"x": x, "y": y,
                           "width": g.map[x][y].width,
                           "height": g.map[x][y].height} 
         else:
             target_x, target_y = g.map[x][y].target
-            destroy_value = c.IMAGES[g.map[target_x][target_y].type].destroy
+            destroy_value = g.get_img(target_x, target_y).destroy
             try:
                 multi_tile = {"x": target_x, "y": target_y,
                               "width": g.map[target_x][target_y].width,
@@ -574,4 +652,4 @@ def destroy_tile(x, y):
                     make_tile(destroy_value[1], i, j)
         make_tile(destroy_value[1], x, y)
     else:
-        make_tile(c.IMAGES[g.map[x][y].type].destroy[1], x, y)
\ No newline at end of file
+        make_tile(g.get_img(x, y).destroy[1], x, y)
\ No newline at end of file
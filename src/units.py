@@ -9,9 +9,11 @@
     Units module, containing classes for all friendly and passive units.
 """
 import random
-from pygame.rect import Rect
 
 from src import entities
+from src import metrics
+from src import networks
+from src import scheduler
 import src.globals as g
 import src.constants as c
 
@@ -101,6 +103,7 @@ class Package(entities.FollowingEntity):
         if self.target_coords == [int(self.x), int(self.y)]:
             x, y = self.get_tile()
             g.tile_maker_queue.insert(0, [self.tile, x, y])
+            entities.spatial_hash.remove(self)
             if self.attached_entity is not None:
                 g.special_entity_list[self.attached_entity].following_entity = None
                 del g.special_entity_list[self.attached_entity + "-" + self.image]
@@ -122,30 +125,13 @@ class Robot(entities.PathingEntity):
                                     collides=collides, wall_collides=wall_collides,
                                     target_coords=target_coords, custom_name=custom_name)
         self.paths_end_func = self._set_deliver_timer
-
-    def goods_pathfind(self, target_goods):
-        if super(Robot, self).goods_pathfind(target_goods):
-            self.goods = target_goods
-            return True
-        else:
-            return False
+        # The tick the robot was sent out on, for measuring how long deliveries take
+        self.sent_tick = None
 
     def _set_deliver_timer(self, i=c.ROBOT_DELIVER_TIME):
         self.stop_moving()
         self.deliver_timer = i
 
-    def pathfind(self, end, target_goods=None):
-        if target_goods is not None:
-            if super(Robot, self).pathfind(end):
-                self.goods = target_goods
-                x, y = self.deliver_tile
-                g.map[x][y].requests[self.goods] -= 1
-                return True
-            else:
-                return False
-        else:
-            return super(Robot, self).pathfind(end)
-
     def tick(self):
         if self.deliver_timer == 5:
             self.image = "robot_empty"
@@ -170,6 +156,11 @@ class Robot(entities.PathingEntity):
         except AttributeError:
             # If the factory tile was replaced, ignore it
             pass
+        else:
+            if self.home_tile is not None and self.sent_tick is not None:
+                metrics.production.delivered(self.home_tile[0], self.home_tile[1], self.goods,
+                                             scheduler.timer_wheel.current_tick - self.sent_tick)
+                networks.settled_networks.delivered(self)
         self.paths_end_func = self.come_home
         if super(Robot, self).pathfind(self.home_tile) is False:
             self.come_home(c.ROBOT_RECONSTRUCT_TIME)
@@ -178,6 +169,7 @@ class Robot(entities.PathingEntity):
         if self.come_home_timer is not None:
             if self.come_home_timer <= 0:
                 self.delete = True
+                networks.settled_networks.returned(self)
                 try:
                     g.map[self.home_tile[0]][self.home_tile[1]].robot_returned(self.number, time)
                 except AttributeError:
@@ -215,40 +207,21 @@ class LauncherRocket(entities.Entity):
             x, y = self.get_tile()
 
 
-    def collision_check(self):
+    def move(self, x_distance, y_distance):
         """ Destroy the rocket if it comes outside of the borders. Also make sure a rocket that collides with a tile
             destroys the tile.
         """
-        entity_rect = Rect(self.x, self.y, self.width, self.height)
-        window_rect = Rect(0, 0, g.width * c.TILE_SIZE, g.height * c.TILE_SIZE)
-        if not window_rect.contains(entity_rect):
-            self.delete = True
-
-        # Make sure collision rectangles are up to date
-        self.update_collision_rects()
-        # Get the tile the entity is standing on
-        tile_pos = self.get_tile()
-        checked_tile_rects = []
-        checked_tiles = []
-
-        # Loop through a 3x3 tile square around the entity, to not check the entire map
-        for i in (range(tile_pos[0]-1, tile_pos[0]+2) if self.dir[0] == 0 else [tile_pos[0] + self.dir[0]]):
-            for j in (range(tile_pos[1]-1, tile_pos[1]+2) if self.dir[1] == 0 else [tile_pos[1] + self.dir[1]]):
-                try:
-                    if c.IMAGES[g.map[i][j].type].collides:
-                        checked_tiles.append((i, j))
-                        checked_tile_rects.append(g.map[i][j].rect())
-
-                except IndexError:  # That index was apparently outside of the map
-                    pass
+        # Rockets only travel along one axis, so only that one needs to be swept
+        if self.dir[0] != 0:
+            self.x, tile = self.sweep(0, x_distance)
+        else:
+            self.y, tile = self.sweep(1, y_distance)
 
-        # Find the tile that collides
-        index = self.rects[(-self.dir[0], -self.dir[1])].collidelist(checked_tile_rects)
-        if index != -1:
+        if tile is not None:
             # Replace that tile.
-            g.tile_maker_queue.insert(0, [self.tile,
-                                          checked_tiles[index][0],
-                                          checked_tiles[index][1]])
+            g.tile_maker_queue.insert(0, [self.tile, tile[0], tile[1]])
             self.delete = True
 
-        return super(LauncherRocket, self).collision_check
\ No newline at end of file
+        if not (0 <= self.x and self.x + self.width <= g.width * c.TILE_SIZE and
+                0 <= self.y and self.y + self.height <= g.height * c.TILE_SIZE):
+            self.delete = True